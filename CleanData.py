@@ -1,11 +1,39 @@
 #Version 1.14.2
 #Data 02.12.2025
+import argparse
+import hashlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+import numpy as np
 import pandas as pd
 import os
 import re
+from DataStore import CLEANED_SCHEMA, RAW_SCHEMA, ColumnarWriter, report_memory
+from Instrument import add_output, add_rows, measure
+from TextIndex import TextIndexWriter
+from StageCache import file_digest
 from Mapping import COUNTRY_CODE, INCOME_MAP, SPONSOR_KEYWORDS
 
 os.makedirs("CleanedData", exist_ok=True)
+
+RAW_FILE = "ictrp_data.csv"
+CLEANED_FILE = "CleanedData/cleaned_ictrp.csv"
+PUBLISHED_FILE = "CleanedData/published_trials.csv"
+COUNTRY_TABLE_FILE = "CleanedData/trial_countries.csv"
+# 增量模式：原始行哈希清单和未填充的清洗结果
+# Incremental mode: raw row hash manifest and the cleaned rows before the median fill
+MANIFEST_FILE = "CleanedData/incremental_manifest.csv"
+STORE_FILE = "CleanedData/incremental_store.pkl"
+# 流式模式每块行数 Rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 100000
+# 删除的敏感字段 Sensitive fields dropped from the output
+SENSITIVE_FIELDS = ['contact_affiliation', 'secondary_sponsor', 'web_address', 'results_url_link']
+# 需要清除HTML标签的长文本列 Long free-text columns that carry HTML
+HTML_FIELDS = ["inclusion_criteria", "exclusion_criteria", "primary_outcome", "secondary_outcome", "intervention"]
+# 每个进程任务处理的行数 Rows per process pool task when stripping HTML
+HTML_BLOCK_ROWS = 20000
+
 # 赞助商分类 Sponsor classification
 def classify_categories(sponsor_name):
     #根据赞助商名称分类为：政府、公司、非营利组织或其他
@@ -23,6 +51,37 @@ def classify_categories(sponsor_name):
     return "Other"
 
 
+# 每个类别预编译一个关键词交替正则 One precompiled keyword alternation per category
+SPONSOR_PATTERNS = {
+    category: re.compile('|'.join(re.escape(k) for k in keywords))
+    for category, keywords in SPONSOR_KEYWORDS.items()
+}
+# 分类优先级 Classification priority
+SPONSOR_PRIORITY = ['Government', 'Industry', 'Non-profit']
+
+
+def classify_sponsor_column(sponsors):
+    """
+    整列赞助商分类 Classify a whole sponsor column at once.
+    Only the unique sponsor strings are matched, against one compiled pattern
+    per category, and the labels are broadcast back to every row. Gives the
+    same result as sponsors.apply(classify_categories).
+    """
+    codes, uniques = pd.factorize(sponsors)
+    upper = pd.Series(uniques, dtype=object).astype(str).str.upper()
+    labels = np.full(len(uniques), "Other", dtype=object)
+    assigned = np.zeros(len(uniques), dtype=bool)
+    for category in SPONSOR_PRIORITY:
+        hit = upper.str.contains(SPONSOR_PATTERNS[category]).to_numpy(dtype=bool) & ~assigned
+        labels[hit] = category
+        assigned |= hit
+    labels[upper.isin(['UNKNOWN', '']).to_numpy()] = "Unknown"
+    # factorize把缺失值编码为-1，末尾追加Unknown
+    # factorize codes missing values as -1, so append "Unknown" for them
+    labels = np.append(labels, "Unknown").astype(object)
+    return pd.Series(labels[codes], index=sponsors.index, dtype=object)
+
+
 def map_income(code_str):
     if pd.isna(code_str):
         return "Unknown"
@@ -33,19 +92,6 @@ def map_income(code_str):
     return "Unknown"
 
 
-# 读取原始数据 Read raw data
-file_path = "ictrp_data.csv"
-df = pd.read_csv(file_path, on_bad_lines="skip", encoding="utf-8")
-print(f"raw data: {len(df)} ")
-
-# 处理日期字段 Process date fields
-date_fields = ['date_registration', 'date_enrollment']
-for field in date_fields:
-    if field in df.columns:
-        df[field] = pd.to_datetime(df[field], format='%Y-%m-%d', errors='coerce').dt.strftime('%Y-%m-%d')
-# 提取注册年份 Extract registration year
-df["Year"] = pd.to_datetime(df["date_registration"], format='%Y-%m-%d', errors="coerce").dt.year
-
 # 清理HTML标签函数 Clean HTML tags function
 def clean_html_tags(text):
     if pd.isna(text):
@@ -56,26 +102,51 @@ def clean_html_tags(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text if text else None
 
-#清除所选列名的html标签 Clear the HTML tags of the selected column names
-html_fields = [ "inclusion_criteria", "exclusion_criteria","primary_outcome","secondary_outcome","intervention"]
-for field in html_fields:
-    if field in df.columns:
-        df[field] = df[field].apply(clean_html_tags)
+
+# 预编译的HTML清理正则 Precompiled HTML cleaning patterns
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+WHITESPACE_PATTERN = re.compile(r'\s+')
 
 
+def strip_html_series(text):
+    """
+    向量化的clean_html_tags Vectorized clean_html_tags over a whole Series.
+    Works on object dtype so every step runs Python's re engine, which keeps
+    the output byte-for-byte identical to the per-row function.
+    """
+    text = text.astype(object)
+    present = text.notna()
+    cleaned = (text[present].map(str)
+               .str.replace(HTML_TAG_PATTERN, '', regex=True)
+               .str.replace('\\r\\n', ' ', regex=False)
+               .str.replace('\\n', ' ', regex=False)
+               .str.replace(WHITESPACE_PATTERN, ' ', regex=True)
+               .str.strip())
+    text[present] = cleaned.where(cleaned != '', None)
+    return text
 
 
-# # print("\noutlier detection...")
-outliers_removed = 0
-# 检测样本量异常值 Check sample size outliers <=1000000 >0
-if 'target_sample_size' in df.columns:
-    df['target_sample_size'] = pd.to_numeric(df['target_sample_size'], errors='coerce')
-    before = len(df)
-    df = df[(df['target_sample_size'].isna()) |
-            ((df['target_sample_size'] > 0) & (df['target_sample_size'] <= 1000000))]
-    removed = before - len(df)
-    outliers_removed += removed
-    # print(f"样本量异常: 删除 {removed} 条")
+def clean_html_columns(df, fields=HTML_FIELDS, pool=None, block_rows=HTML_BLOCK_ROWS):
+    """
+    清除多列HTML标签 Strip HTML from several columns.
+    With a process pool the work is split by column and by row block.
+    """
+    fields = [f for f in fields if f in df.columns]
+    if pool is None:
+        for field in fields:
+            df[field] = strip_html_series(df[field])
+        return df
+
+    futures = {
+        field: [pool.submit(strip_html_series, df[field].iloc[start:start + block_rows])
+                for start in range(0, len(df), block_rows)]
+        for field in fields
+    }
+    for field, blocks in futures.items():
+        if blocks:
+            df[field] = pd.concat([block.result() for block in blocks])
+    return df
+
 
 # 年龄验证 Age validation
 def validate_age(age_text):
@@ -94,130 +165,418 @@ def validate_age(age_text):
         return True
     return 0 <= age <= 120
 
-# 检测年龄异常值 Check age outliers
-# 检查年龄逻辑是否合理 Check age logic validity
-if 'inclusion_age_min' in df.columns and 'inclusion_age_max' in df.columns:
-    before = len(df)
-    # 检查最小和最大年龄都有效 Check that both the minimum and maximum age are valid
-    df = df[df['inclusion_age_min'].apply(validate_age)]
-    df = df[df['inclusion_age_max'].apply(validate_age)]
-    removed = before - len(df)
-    outliers_removed += removed
-print(f"deleted in total {outliers_removed} ")
-#
-# print("\nDelete information")
-sensitive_fields = ['contact_affiliation', 'secondary_sponsor', 'web_address', 'results_url_link']
-removed_fields = []
-for field in sensitive_fields:
-    if field in df.columns:
-        df = df.drop(field, axis=1)
-        removed_fields.append(field)
-
-if removed_fields:
-    print(f"Delete: {', '.join(removed_fields)}")
-
-# print("\nfill...")
-fill_fields = ["standardised_condition", "countries", "primary_sponsor", "phase", "study_type"]
-for field in fill_fields:
-    if field in df.columns:
-        df[field] = df[field].fillna("Unknown")
-
-if "results_ind" in df.columns:
-    df["results_ind"] = df["results_ind"].fillna("No")
-
-if "target_sample_size" in df.columns:
-    median_value = df["target_sample_size"].median()
-    df["target_sample_size"] = df["target_sample_size"].fillna(median_value)
-    print(f"Fill in missing values of sample size with median: {median_value}")
-# 赞助商分类 Sponsor classification
-df["sponsor_category"] = df["primary_sponsor"].apply(classify_categories)
-##世界收入分类 Worldbank Classification
-df["income_level"] = df["country_codes"].apply(map_income)
-#统计赞助商分类占比 Proportion of sponsor classification
-all_sponsor_counts = df["sponsor_category"].value_counts()
-print("\nSponsor Category Classification:")
-for category, count in all_sponsor_counts.items():
-    print(f"  {category}: {count} ({count / len(df) * 100:.1f}%)")
- 
-# 统计各国实验数量 Count the number of experiments in each country
-if 'country_codes' in df.columns:
-    # 处理多国家情况进行统计 Handling multi country situations for statistical analysis
-    country_list = []
-    for codes in df['country_codes'].dropna():
-        codes_str = str(codes).strip()
-        if '|' in codes_str:
-            codes = [c.strip() for c in codes_str.split('|')]
-        else:
-            codes = [codes_str]
-
-        # Escaping country codes
-        for code in codes:
-            code = code.upper()
-            if code in COUNTRY_CODE:
-                country_list.append(COUNTRY_CODE[code])
-
-    country_counts = pd.Series(country_list).value_counts()
+
+# 年龄单位换算为月 Months per age unit; a number without unit counts as years
+AGE_UNIT_MONTHS = {'Y': 12.0, 'M': 1.0, 'W': 12 / 52.0, 'D': 12 / 365.25, '': 12.0}
+AGE_PATTERN = re.compile(r'(?P<value>\d+)\s*(?P<unit>[A-Za-z]?)')
+
+
+def parse_age_column(ages):
+    """
+    向量化年龄解析 Vectorized age parsing in one str.extract pass.
+    Returns a frame with the first number ('value'), the age normalised to
+    months ('months') and the validity flag ('valid'). The flag follows the
+    same rules as validate_age, so the filter keeps exactly the same rows.
+    """
+    ages = ages.astype(object)
+    parts = ages.str.extract(AGE_PATTERN)
+    # \d也匹配其他文字的数字，与validate_age一样用int转换
+    # \d also matches non-ASCII digits (e.g. '٣', '６'); int() reads them as validate_age does
+    digits = parts['value'].dropna().unique()
+    value = parts['value'].map(dict(zip(digits, map(int, digits)))).astype(float)
+    unit_months = parts['unit'].str.upper().map(AGE_UNIT_MONTHS)
+    lower = ages.str.lower()
+
+    # 与validate_age相同的单位判断 Same unit checks as validate_age
+    year_rule = lower.str.contains('y', regex=False).fillna(False).astype(bool)
+    month_rule = ~year_rule & lower.str.contains('m', regex=False).fillna(False).astype(bool)
+    free_rule = ~year_rule & ~month_rule & lower.str.contains('week', regex=False).fillna(False).astype(bool)
+    upper_bound = np.select([month_rule, free_rule], [1440, np.inf], default=120)
+
+    return pd.DataFrame({
+        'value': value,
+        'months': (value * unit_months).round(2),
+        'valid': value.isna() | ((value >= 0) & (value <= upper_bound)),
+    }, index=ages.index)
+
+
+def read_raw(file_path=RAW_FILE, chunksize=None, usecols=None):
+    # 读取原始数据，chunksize不为空时返回分块迭代器
+    # Read raw data; returns a chunk iterator when chunksize is given.
+    # usecols is applied after parsing: given to read_csv, it keeps over-long
+    # malformed lines that a full-width read skips, so a column subset would
+    # see different rows than the cleaning pass
+    data = pd.read_csv(file_path, on_bad_lines="skip", encoding="utf-8", chunksize=chunksize, dtype=RAW_SCHEMA)
+    if usecols is None:
+        return data
+    if chunksize is None:
+        return select_columns(data, usecols)
+    return (select_columns(chunk, usecols) for chunk in data)
+
+
+def select_columns(df, usecols):
+    # 按文件中的顺序取列 The requested columns, in file order, as read_csv's usecols gives them
+    missing = [col for col in usecols if col not in df.columns]
+    if missing:
+        raise ValueError(f"Usecols do not match columns, columns expected but not found: {missing}")
+    return df[[col for col in df.columns if col in set(usecols)]]
+
+
+def filter_outliers(df, measured=True):
+    """
+    删除样本量和年龄异常值 Drop sample size and age outliers, returns
+    (df, removed). measured=False leaves the age validation out of the run
+    report, for the streaming median pass.
+    """
+    outliers_removed = 0
+    # 检测样本量异常值 Check sample size outliers <=1000000 >0
+    if 'target_sample_size' in df.columns:
+        df['target_sample_size'] = pd.to_numeric(df['target_sample_size'], errors='coerce').astype(float)
+        before = len(df)
+        df = df[(df['target_sample_size'].isna()) |
+                ((df['target_sample_size'] > 0) & (df['target_sample_size'] <= 1000000))]
+        outliers_removed += before - len(df)
+
+    # 检测年龄异常值 Check age outliers
+    # 检查年龄逻辑是否合理 Check age logic validity
+    if 'inclusion_age_min' in df.columns and 'inclusion_age_max' in df.columns:
+        before = len(df)
+        with measure("age validation", rows_in=before) if measured else nullcontext({}) as step:
+            min_age = parse_age_column(df['inclusion_age_min'])
+            max_age = parse_age_column(df['inclusion_age_max'])
+            # 检查最小和最大年龄都有效 Check that both the minimum and maximum age are valid
+            keep = min_age['valid'] & max_age['valid']
+            df = df[keep].copy()
+            df['age_min_months'] = min_age.loc[keep, 'months']
+            df['age_max_months'] = max_age.loc[keep, 'months']
+            step["rows_out"] = len(df)
+        outliers_removed += before - len(df)
+    return df, outliers_removed
+
+
+def clean_chunk(df, pool=None):
+    """
+    逐行清洗步骤（不含样本量中位数填充）
+    Row-local cleaning steps, everything except the sample size median fill.
+    Safe to run on any slice of the raw file; returns (df, outliers_removed).
+    An optional process pool is used for the HTML stripping.
+    """
+    # 处理日期字段 Process date fields
+    date_fields = ['date_registration', 'date_enrollment']
+    for field in date_fields:
+        if field in df.columns:
+            df[field] = pd.to_datetime(df[field], format='%Y-%m-%d', errors='coerce').dt.strftime('%Y-%m-%d')
+    # 提取注册年份 Extract registration year
+    # Int64 keeps the year integer even when a chunk has no valid date
+    df["Year"] = pd.to_datetime(df["date_registration"], format='%Y-%m-%d', errors="coerce").dt.year.astype("Int64")
+
+    #清除所选列名的html标签 Clear the HTML tags of the selected column names
+    with measure("html cleaning", rows_in=len(df)) as step:
+        df = clean_html_columns(df, HTML_FIELDS, pool=pool)
+        step["rows_out"] = len(df)
+
+    df, outliers_removed = filter_outliers(df)
+
+    # 删除敏感信息 Delete sensitive information
+    df = df.drop(columns=[f for f in SENSITIVE_FIELDS if f in df.columns])
+
+    fill_fields = ["standardised_condition", "countries", "primary_sponsor", "phase", "study_type"]
+    for field in fill_fields:
+        if field in df.columns:
+            df[field] = df[field].fillna("Unknown")
+
+    if "results_ind" in df.columns:
+        df["results_ind"] = df["results_ind"].fillna("No")
+
+    # 赞助商分类 Sponsor classification
+    df["sponsor_category"] = classify_sponsor_column(df["primary_sponsor"])
+    ##世界收入分类 Worldbank Classification
+    df["income_level"] = df["country_codes"].apply(map_income)
+    # 待打分的新实验可能没有结果列 Trials being scored may have no results column
+    if "results_ind" in df.columns:
+        df["results_posted"] = df["results_ind"].str.upper().str.strip() == "YES"
+    return df, outliers_removed
+
+
+def explode_countries(df):
+    """
+    国家长表 Long trial-to-country table, one row per (trial, country).
+    Built with one vectorized split/explode over country_codes; keeps the row
+    labels of df so it can be masked by any per-trial column.
+    """
+    codes = df['country_codes'].astype(object).str.split('|').explode().str.strip().str.upper()
+    codes = codes[codes.isin(COUNTRY_CODE.keys())]
+    return pd.DataFrame({
+        'trial_id': df.loc[codes.index, 'trial_id'],
+        'iso3': codes,
+        'country_name': codes.map(COUNTRY_CODE),
+    }, index=codes.index)
+
+
+def count_countries(country_table):
+    """统计各国实验数量 Count trials per country from the long country table"""
+    # sort=False保持首次出现顺序 sort=False keeps first-seen order for the counters
+    return Counter(country_table['country_name'].value_counts(sort=False).to_dict())
+
+
+def counter_to_series(counter):
+    # 按数量降序，数量相同时保持首次出现顺序 Descending, ties keep first-seen order
+    return pd.Series(counter, dtype="int64").sort_values(ascending=False, kind="stable")
+
+
+def median_from_counts(value_counts):
+    """由取值频数精确计算中位数 Exact median from a value -> count table"""
+    if value_counts.empty:
+        return np.nan
+    value_counts = value_counts.sort_index()
+    cumulative = value_counts.cumsum().to_numpy()
+    n = cumulative[-1]
+    lower = value_counts.index[np.searchsorted(cumulative, (n - 1) // 2 + 1)]
+    upper = value_counts.index[np.searchsorted(cumulative, n // 2 + 1)]
+    return (lower + upper) / 2
+
+
+def streaming_sample_size_median(file_path, chunksize):
+    """
+    第一遍：只保留过滤所需的列，累计样本量频数
+    First pass: keep only the columns the outlier filter needs and accumulate
+    sample size frequencies, so the median is exact while memory stays bounded
+    by the number of distinct sample sizes.
+    """
+    header = pd.read_csv(file_path, nrows=0, encoding="utf-8").columns
+    usecols = [c for c in ['target_sample_size', 'inclusion_age_min', 'inclusion_age_max'] if c in header]
+    if 'target_sample_size' not in usecols:
+        return np.nan
+    totals = pd.Series(dtype="int64")
+    # 年龄校验只在第二遍记录 The age validation is recorded once, in the cleaning pass
+    with measure("sample size median") as step:
+        for chunk in read_raw(file_path, chunksize=chunksize, usecols=usecols):
+            add_rows(rows_in=len(chunk))
+            chunk, _ = filter_outliers(chunk, measured=False)
+            totals = totals.add(chunk['target_sample_size'].value_counts(), fill_value=0)
+        step["rows_out"] = int(totals.sum())
+    return median_from_counts(totals)
+
+
+def clean_chunks(chunks, pool=None):
+    # 逐块清洗 Clean chunk by chunk, yields (cleaned, raw_rows, outliers_removed)
+    for df in chunks:
+        raw_rows = len(df)
+        df, removed = clean_chunk(df, pool=pool)
+        yield df, raw_rows, removed
+
+
+def hash_rows(raw):
+    # 每行原始内容的64位哈希 64-bit hash of each raw row's content
+    return pd.util.hash_pandas_object(raw.astype(object), index=False)
+
+
+def cleaning_fingerprint(raw_columns):
+    """
+    清洗规则指纹 Hash of everything that decides a cleaned row besides the raw
+    row itself: CleanData.py, Mapping.py, the cleaned schema and the raw
+    columns (which fix the output columns). Stored rows are only reused when
+    it matches.
+    """
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ["CleanData.py", "Mapping.py"]:
+        digest.update(file_digest(os.path.join(here, name)).encode())
+    digest.update(repr(sorted(CLEANED_SCHEMA.items())).encode())
+    digest.update("|".join(map(str, raw_columns)).encode())
+    return digest.hexdigest()[:16]
+
+
+def incremental_clean(file_path=RAW_FILE, pool=None):
+    """
+    增量清洗 Re-clean only new or changed raw rows.
+    The manifest maps trial_id to the hash of its raw row and whether it
+    survived cleaning; the store keeps the cleaned rows before the global
+    median fill. Unchanged rows come from the store, deleted trials drop out,
+    and the merged result (in raw file order) is returned for the global steps.
+    Returns (cleaned, raw_rows, outliers_removed) like clean_chunks.
+    """
+    raw = read_raw(file_path)
+    manifest = pd.DataFrame({'trial_id': raw['trial_id'].to_numpy(), 'row_hash': hash_rows(raw).to_numpy()})
+    code = cleaning_fingerprint(raw.columns)
+
+    previous = None
+    if os.path.exists(MANIFEST_FILE) and os.path.exists(STORE_FILE) and raw['trial_id'].is_unique:
+        previous = pd.read_csv(MANIFEST_FILE, dtype={'trial_id': str, 'row_hash': 'uint64', 'kept': bool,
+                                                     'fingerprint': str})
+        if 'fingerprint' not in previous.columns or not (previous['fingerprint'] == code).all():
+            # 清洗规则变了，旧结果作废 The cleaning rules changed: the stored rows are stale
+            print("Incremental: cleaning code or columns changed, re-cleaning every row")
+            previous = None
+    if previous is not None:
+        # 上次若有重复trial_id，这些行视为新行，避免合并时行数膨胀
+        # trial_ids repeated in the last run count as new, so the merge cannot fan out
+        previous = previous.drop(columns='fingerprint').drop_duplicates('trial_id', keep=False)
+        store = pd.read_pickle(STORE_FILE)
+    else:
+        # 首次运行、trial_id不唯一或规则改变时全部重新清洗
+        # First run, duplicate ids or changed rules: clean everything
+        previous = pd.DataFrame({'trial_id': pd.Series(dtype=str), 'row_hash': pd.Series(dtype='uint64'),
+                                 'kept': pd.Series(dtype=bool)})
+        store = None
+
+    # trial_id和哈希都相同的行未改变 Rows with the same trial_id and hash are unchanged
+    manifest = manifest.merge(previous, on=['trial_id', 'row_hash'], how='left')
+    unchanged = manifest['kept'].notna().to_numpy()
+    known = manifest['trial_id'].isin(previous['trial_id']).to_numpy()
+    deleted = int((~previous['trial_id'].isin(manifest['trial_id'])).sum())
+    print(f"Incremental: {int((~known).sum())} new, {int((known & ~unchanged).sum())} changed, "
+          f"{deleted} deleted, {int(unchanged.sum())} unchanged")
+
+    # 行标签即原始行号 The row labels are the raw row numbers, kept through clean_chunk
+    cleaned, _ = clean_chunk(raw[~unchanged].copy(), pool=pool)
+    kept = np.zeros(len(raw), dtype=bool)
+    kept[cleaned.index.to_numpy()] = True
+    if store is not None:
+        # 只有trial_id唯一时才使用存储，可按trial_id找到当前行号
+        # The store is only used when trial_ids are unique, so they give the current raw row
+        store = store[store['trial_id'].isin(manifest.loc[unchanged, 'trial_id'])]
+        store.index = pd.Index(raw['trial_id']).get_indexer(store['trial_id'])
+        cleaned = pd.concat([store, cleaned])
+    # 恢复原始文件顺序 Restore raw file order
+    cleaned = cleaned.sort_index(kind='stable').reset_index(drop=True)
+
+    manifest.loc[~unchanged, 'kept'] = kept[~unchanged]
+    manifest['kept'] = manifest['kept'].astype(bool)
+    manifest['fingerprint'] = code
+    manifest.to_csv(MANIFEST_FILE, index=False)
+    cleaned.to_pickle(STORE_FILE)
+    return cleaned, len(raw), int((~manifest['kept']).sum())
+
+
+def main(stream=False, chunksize=DEFAULT_CHUNKSIZE, file_path=RAW_FILE, workers=1, incremental=False):
+    # 多进程清除HTML Multi-process HTML stripping when workers > 1
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    median_value = None
+    if incremental:
+        cleaned_chunks = [incremental_clean(file_path, pool=pool)]
+    elif stream:
+        # 两遍流式处理 Two-pass streaming: median first, then clean chunk by chunk
+        median_value = streaming_sample_size_median(file_path, chunksize)
+        cleaned_chunks = clean_chunks(read_raw(file_path, chunksize=chunksize), pool=pool)
+    else:
+        raw = read_raw(file_path)
+        report_memory(raw, "CleanData: raw")
+        cleaned_chunks = clean_chunks([raw], pool=pool)
+
+    raw_rows, total_rows, published_rows, outliers_removed = 0, 0, 0, 0
+    header = pd.read_csv(file_path, nrows=0, encoding="utf-8").columns
+    removed_fields = [f for f in SENSITIVE_FIELDS if f in header]
+    sponsor_counter = Counter()
+    country_counter, industry_counter, published_counter = Counter(), Counter(), Counter()
+    industry_rows, country_rows = 0, 0
+    year_min, year_max = None, None
+
+    with open(CLEANED_FILE, "w", encoding="utf-8-sig", newline="") as cleaned_out, \
+            open(PUBLISHED_FILE, "w", encoding="utf-8-sig", newline="") as published_out, \
+            open(COUNTRY_TABLE_FILE, "w", encoding="utf-8-sig", newline="") as countries_out, \
+            ColumnarWriter("cleaned_ictrp") as cleaned_columnar, \
+            ColumnarWriter("trial_countries") as countries_columnar, \
+            TextIndexWriter() as condition_index:
+        for i, (df, chunk_raw_rows, removed) in enumerate(cleaned_chunks):
+            raw_rows += chunk_raw_rows
+            outliers_removed += removed
+
+            if "target_sample_size" in df.columns:
+                if median_value is None:
+                    median_value = df["target_sample_size"].median()
+                df["target_sample_size"] = df["target_sample_size"].fillna(median_value)
+
+            sponsor_counter.update(df["sponsor_category"])
+            if 'country_codes' in df.columns:
+                # 所有统计都来自同一张国家长表 Every country count comes from one long table
+                country_table = explode_countries(df)
+                country_table.to_csv(countries_out, index=False, header=(i == 0))
+                countries_columnar.write(country_table)
+                country_rows += len(country_table)
+                country_counter.update(count_countries(country_table))
+                # 筛选Industry类别 Filter Industry Category
+                is_industry = df['sponsor_category'] == 'Industry'
+                industry_rows += int(is_industry.sum())
+                industry_counter.update(count_countries(country_table[is_industry.loc[country_table.index].to_numpy()]))
+                #统计已发表的国家 Statistics published
+                published_counter.update(count_countries(country_table[df.loc[country_table.index, "results_posted"].to_numpy()]))
+            published_df = df[df["results_posted"] == True]
+
+            total_rows += len(df)
+            published_rows += len(published_df)
+            if df["Year"].notna().any():
+                chunk_min, chunk_max = int(df["Year"].min()), int(df["Year"].max())
+                year_min = chunk_min if year_min is None else min(year_min, chunk_min)
+                year_max = chunk_max if year_max is None else max(year_max, chunk_max)
+
+            df.to_csv(cleaned_out, index=False, header=(i == 0))
+            # 列式副本供分析阶段读取 Columnar copy for the analysis stages
+            cleaned_columnar.write(df)
+            # 疾病和标题的倒排索引 Inverted index of the condition and title words
+            condition_index.write(df)
+            published_df.to_csv(published_out, index=False, header=(i == 0))
+            if stream:
+                print(f"chunk {i + 1}: {total_rows} rows written")
+    if pool is not None:
+        pool.shutdown()
+    add_rows(rows_in=raw_rows, rows_out=total_rows)
+    add_output(CLEANED_FILE, total_rows)
+    add_output(PUBLISHED_FILE, published_rows)
+    if country_rows:
+        add_output(COUNTRY_TABLE_FILE, country_rows)
+
+    print(f"raw data: {raw_rows} ")
+    print(f"deleted in total {outliers_removed} ")
+    if removed_fields:
+        print(f"Delete: {', '.join(removed_fields)}")
+    if median_value is not None:
+        print(f"Fill in missing values of sample size with median: {median_value}")
+
+    #统计赞助商分类占比 Proportion of sponsor classification
+    print("\nSponsor Category Classification:")
+    for category, count in counter_to_series(sponsor_counter).items():
+        print(f"  {category}: {count} ({count / total_rows * 100:.1f}%)")
+
     # 保存完整的国家统计 Save complete national statistics
-    country_counts.to_csv("CleanedData/country_statistics.csv", header=['count'], index_label='country', encoding="utf-8-sig")
-    print(f"\nTotal countries with trials: {len(country_counts)}")
+    if country_counter:
+        country_counts = counter_to_series(country_counter)
+        country_counts.to_csv("CleanedData/country_statistics.csv", header=['count'], index_label='country', encoding="utf-8-sig")
+        add_output("CleanedData/country_statistics.csv", len(country_counts))
+        print(f"\nTotal countries with trials: {len(country_counts)}")
     #按赞助商分类统计各国实验数量 Count the number of experiments in each country by sponsor classification
-if 'country_codes' in df.columns and 'sponsor_category' in df.columns:
-    # 筛选Industry类别 Filter Industry Category
-    industry_df = df[df['sponsor_category'] == 'Industry']
-
-    # 提取所有国家代码 Extract all country codes
-    industry_countries = []
-    for codes in industry_df['country_codes'].dropna():
-        for code in str(codes).upper().replace('|', ' ').split():
-            if code in COUNTRY_CODE:
-                industry_countries.append(COUNTRY_CODE[code])
-
-    # 统计并保存 Statistics and Save
-    if industry_countries:
-        pd.Series(industry_countries).value_counts().to_csv(
+    if industry_counter:
+        counter_to_series(industry_counter).to_csv(
             "CleanedData/country_Industry.csv",
             header=['count'],
             index_label='country',
             encoding="utf-8-sig"
         )
-        print(f"Industry: {len(industry_df)} trials across {len(set(industry_countries))} countries")
-        #统计已发表的国家 Statistics published
-df["results_posted"] = df["results_ind"].str.upper().str.strip() == "YES"
-published_df = df[df["results_posted"] == True].copy()
-if 'country_codes' in published_df.columns:
-    published_country_list = []
-    for codes in published_df['country_codes'].dropna():
-        codes_str = str(codes).strip()
-        if '|' in codes_str:
-            codes = [c.strip() for c in codes_str.split('|')]
-        else:
-            codes = [codes_str]
-
-        # Escaping country codes
-        for code in codes:
-            code = code.upper()
-            if code in COUNTRY_CODE:
-                published_country_list.append(COUNTRY_CODE[code])
-
-    published_country_counts = pd.Series(published_country_list).value_counts()
-    published_country_counts.to_csv(f"CleanedData/published_country_statistics.csv",header=['count'], index_label='country', encoding="utf-8-sig")
-print(f"\nPublished: {len(published_df)} ({len(published_df) / len(df) * 100:.1f}%)")
-print(f"Unpublished: {len(df) - len(published_df)} ({(len(df) - len(published_df)) / len(df) * 100:.1f}%)")
-
-df.to_csv("CleanedData/cleaned_ictrp.csv", index=False, encoding="utf-8-sig")
-published_df.to_csv("CleanedData/published_trials.csv", index=False, encoding="utf-8-sig")
-
-# 根据 pregnant_participants 字段筛选孕妇相关试验
-#Screening pregnant women related trials based on the pregnant_participants field
-# if 'pregnant_participants' in df.columns:
-#     pregnant_trials = df[df['pregnant_participants'].str.upper().str.strip() == 'INCLUDED'].copy()
-#     pregnant_trials.to_csv("CleanedData/pregnant_trials.csv", index=False, encoding="utf-8-sig")
-#     print(f"Pregnant Trials: {len(pregnant_trials)}")
-# else:
-#     print("Warning: 'pregnant_participants' column not found in data")
-#     pregnant_trials = pd.DataFrame()
-
-print("\nData Cleaning Completed!")
-print(f"Time Range: {int(df['Year'].min())} - {int(df['Year'].max())}")
-print(f"Total Trials: {len(df)}")
-print("\n All CleanData completed ")
+        add_output("CleanedData/country_Industry.csv", len(industry_counter))
+        print(f"Industry: {industry_rows} trials across {len(industry_counter)} countries")
+    if published_counter:
+        counter_to_series(published_counter).to_csv("CleanedData/published_country_statistics.csv", header=['count'], index_label='country', encoding="utf-8-sig")
+        add_output("CleanedData/published_country_statistics.csv", len(published_counter))
+    print(f"\nPublished: {published_rows} ({published_rows / total_rows * 100:.1f}%)")
+    print(f"Unpublished: {total_rows - published_rows} ({(total_rows - published_rows) / total_rows * 100:.1f}%)")
+
+    print("\nData Cleaning Completed!")
+    print(f"Time Range: {year_min} - {year_max}")
+    print(f"Total Trials: {total_rows}")
+    print("\n All CleanData completed ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the raw ICTRP export")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--stream", action="store_true",
+                      help="read the raw file in bounded chunks (for multi-GB dumps)")
+    mode.add_argument("--incremental", action="store_true",
+                      help="only re-clean raw rows that are new or changed since the last run")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows per chunk in streaming mode")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used for HTML stripping (1 = in-process)")
+    args = parser.parse_args()
+    main(stream=args.stream, chunksize=args.chunksize, workers=args.workers, incremental=args.incremental)
@@ -0,0 +1,201 @@
+# 数据交接 Cleaned data hand-off between CleanData and the analysis stages
+# CleanData writes every table as CSV and, when pyarrow is installed, as a
+# Parquet file next to it. The analysis stages load through load_table, which
+# prefers the Parquet copy and gives the same dtypes either way, and only
+# reads the columns a stage asks for.
+import os
+import pandas as pd
+from Instrument import add_rows
+
+DATA_DIR = "CleanedData"
+
+# 原始ICTRP列的类型 Declared dtypes of the raw ICTRP columns.
+# Everything is read as text; CleanData does the numeric and date parsing.
+RAW_SCHEMA = {
+    'trial_id': 'str', 'study_title': 'str', 'standardised_condition': 'str',
+    'original_condition': 'str', 'country_codes': 'str', 'countries': 'str',
+    'centre': 'str', 'intervention': 'str', 'source_register': 'str',
+    'date_registration': 'str', 'date_enrollment': 'str', 'study_type': 'str',
+    'phase': 'str', 'randomization': 'str', 'placebo': 'str', 'masking': 'str',
+    'primary_purpose': 'str', 'endpoint_classification': 'str',
+    'intervention_model': 'str', 'primary_outcome': 'str', 'secondary_outcome': 'str',
+    'target_sample_size': 'str', 'inclusion_age_min': 'str', 'inclusion_age_max': 'str',
+    'inclusion_gender': 'str', 'pregnant_participants': 'str',
+    'inclusion_criteria': 'str', 'exclusion_criteria': 'str', 'primary_sponsor': 'str',
+    'secondary_sponsor': 'str', 'contact_affiliation': 'str', 'web_address': 'str',
+    'results_ind': 'str', 'results_date_completed': 'str', 'results_date_posted': 'str',
+    'results_url_link': 'str', 'retrospective_flag': 'str',
+}
+
+# 清洗后数据表的类型 Declared dtypes of the cleaned tables; columns not listed are text
+CLEANED_SCHEMA = {
+    'phase': 'category',
+    'study_type': 'category',
+    'sponsor_category': 'category',
+    'income_level': 'category',
+    'date_registration': 'datetime64[ns]',
+    'date_enrollment': 'datetime64[ns]',
+    'target_sample_size': 'float64',
+    'Year': 'Int64',
+    'age_min_months': 'float64',
+    'age_max_months': 'float64',
+    'results_posted': 'bool',
+}
+
+
+def split_multi(text):
+    """
+    拆分'|'列表 Tokens of a '|'-joined field such as country_codes.
+    Used as a tokenizer inside fitted models, so it lives in a module that
+    is never run as __main__ and the pickled models load anywhere.
+    """
+    return [token.strip() for token in text.split("|") if token.strip()]
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def csv_path(name):
+    return os.path.join(DATA_DIR, f"{name}.csv")
+
+
+def parquet_path(name):
+    return os.path.join(DATA_DIR, f"{name}.parquet")
+
+
+def to_columnar(df):
+    """转换为声明的类型 Apply the dtypes declared in CLEANED_SCHEMA"""
+    df = df.copy()
+    for col, dtype in CLEANED_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'datetime64[ns]':
+            df[col] = pd.to_datetime(df[col], format='%Y-%m-%d', errors='coerce').astype(dtype)
+        elif df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _arrow_schema(df):
+    # 固定的Arrow类型，保证每个数据块的模式一致
+    # Fixed Arrow types so every streamed chunk has the same schema
+    import pyarrow as pa
+    arrow_types = {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'datetime64[ns]': pa.timestamp('ns'),
+        'float64': pa.float64(),
+        'Int64': pa.int64(),
+        'bool': pa.bool_(),
+    }
+    return pa.schema([(col, arrow_types.get(CLEANED_SCHEMA.get(col), pa.string())) for col in df.columns])
+
+
+def _as_text(series):
+    # 文本列统一为str或None Text columns as str/None, whatever read_csv inferred
+    present = series.notna()
+    text = series.astype(object).where(present, None)
+    text[present] = text[present].map(str)
+    return text
+
+
+class ColumnarWriter:
+    """
+    分块写入Parquet Appends DataFrame chunks to CleanedData/<name>.parquet.
+    Without pyarrow it only removes a stale Parquet copy, so the stages fall
+    back to the CSV written in the same run.
+    """
+
+    def __init__(self, name):
+        self.path = parquet_path(name)
+        self.enabled = parquet_available()
+        self.schema = None
+        self._writer = None
+        if not self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write(self, df):
+        if not self.enabled:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        df = to_columnar(df)
+        for col in [c for c in df.columns if c not in CLEANED_SCHEMA]:
+            df[col] = _as_text(df[col])
+        if self._writer is None:
+            self.schema = _arrow_schema(df)
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def report_memory(df, label):
+    """打印内存占用 Print the in-memory size of a loaded frame"""
+    size_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"[{label}] {len(df)} rows x {len(df.columns)} columns, {size_mb:.2f} MB in memory")
+
+
+def load_table(name, columns=None, stage=None):
+    """
+    读取数据表 Load a CleanedData table, preferring the Parquet copy.
+    columns limits what is parsed and held (None reads everything); when a
+    stage name is given the memory used is reported under that name.
+    """
+    if parquet_available() and os.path.exists(parquet_path(name)):
+        df = pd.read_parquet(parquet_path(name), columns=columns)
+    else:
+        df = pd.read_csv(csv_path(name), encoding="utf-8-sig", usecols=columns)
+        if columns is not None:
+            df = df[columns]
+    df = to_columnar(df)
+    # 计入当前阶段的输入行数 Counted as input rows of the stage being measured
+    add_rows(rows_in=len(df))
+    if stage is not None:
+        report_memory(df, f"{stage}: {name}")
+    return df
+
+
+def iter_table(name, columns=None, chunksize=100000):
+    """
+    分块读取数据表 Stream a CleanedData table in chunks of about chunksize
+    rows, with the same dtypes as load_table, so memory stays bounded.
+    """
+    if parquet_available() and os.path.exists(parquet_path(name)):
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(parquet_path(name)).iter_batches(batch_size=chunksize, columns=columns)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = pd.read_csv(csv_path(name), encoding="utf-8-sig", usecols=columns, chunksize=chunksize)
+    for chunk in chunks:
+        if columns is not None:
+            chunk = chunk[columns]
+        add_rows(rows_in=len(chunk))
+        yield to_columnar(chunk)
+
+
+def load_cleaned(columns=None, stage=None, df=None):
+    """
+    读取清洗后的数据 Load the cleaned trials table.
+    When df (an already loaded cleaned table, e.g. shared by Main.py) is given,
+    the columns are taken from it instead of reading the file again.
+    """
+    if df is None:
+        return load_table("cleaned_ictrp", columns=columns, stage=stage)
+    df = df[columns].copy() if columns is not None else df.copy()
+    add_rows(rows_in=len(df))
+    if stage is not None:
+        report_memory(df, f"{stage}: cleaned_ictrp (shared)")
+    return df
@@ -0,0 +1,204 @@
+# 药物名称规范化 Drug name normalisation for ExtractDrug.py
+# SYNONYMS maps each canonical name (the INN, or the usual name of a fixed
+# combination or formulation) to the other names trials register it under:
+# brand names, salt forms, code names, abbreviations and misspellings.
+# DrugMatcher compiles every name into one multi-pattern matcher, an
+# Aho-Corasick automaton when pyahocorasick is installed and a single regex
+# alternation otherwise, and finds all of them in one pass over a text. Dose
+# suffixes need no rules of their own: only dictionary names are matched.
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+PLACEBO = "Placebo"
+
+# 规范名 -> 其他写法（均不区分大小写） Canonical name -> other names, all case-insensitive
+SYNONYMS = {
+    PLACEBO: ["placebo", "placebos"],
+    # 恰加斯病 Chagas disease
+    "Benznidazole": ["benznidazol", "rochagan", "radanil", "abarax", "lafepe benznidazole"],
+    "Nifurtimox": ["lampit", "baya2502", "bay a2502", "bay 2502"],
+    # E1224是前药，活性成分拉夫康唑单独计数 E1224 is the prodrug; ravuconazole, its active moiety, counts apart
+    "Fosravuconazole": ["e1224", "e-1224"],
+    "Ravuconazole": [],
+    "Posaconazole": ["noxafil"],
+    "Amiodarone": [],
+    # 利什曼病 Leishmaniasis
+    "Liposomal amphotericin B": ["ambisome", "l-amb", "amphotericin b liposome", "amphotericin b liposomal",
+                                 "liposomal amphotericin", "liposomal amb"],
+    "Amphotericin B deoxycholate": ["amphotericin b-deoxycholate", "amphotericin b desoxycholate",
+                                    "fungizone", "d-amb"],
+    "Amphotericin B fat emulsion": ["amphotericin b in fat emulsion"],
+    "Miltefosine": ["mitefosine", "impavido"],
+    "Paromomycin": ["paromomycin sulfate", "paromomycin sulphate", "paramomycin", "aminosidine"],
+    "Sodium stibogluconate": ["pentostam", "stibogluconate"],
+    "Meglumine antimoniate": ["antimoniate of n-methylglucamine", "n-methylglucamine antimoniate",
+                              "glucantime", "meglumine antimonate"],
+    "Pentavalent antimonial": ["pentavalent antimonials", "pentavalent antimony"],
+    "Sitamaquine": [],
+    "Fexinidazole": [],
+    "Pentamidine": ["pentamidine isethionate"],
+    # 血吸虫病和土源性蠕虫病 Schistosomiasis and soil-transmitted helminths
+    "Praziquantel": ["biltricide", "praziquantl", "cesol", "distocide"],
+    "Arpraziquantel": ["l-pzq", "levo praziquantel", "levo-praziquantel", "levopraziquantel", "l-praziquantel"],
+    "Albendazole": ["zentel", "albenza"],
+    "Mebendazole": ["vermox"],
+    "Ivermectin": ["stromectol", "mectizan"],
+    "Moxidectin": [],
+    "Diethylcarbamazine": ["hetrazan"],
+    "Emodepside": [],
+    "Oxantel pamoate": ["oxantel"],
+    "Pyrantel pamoate": ["pyrantel"],
+    "Tribendimidine": [],
+    "Oxfendazole": [],
+    # 抗疟药 Antimalarials
+    "Artemether-lumefantrine": ["artemether lumefantrine", "artemether/lumefantrine", "coartem"],
+    "Artesunate-pyronaridine": ["pyronaridine-artesunate", "artesunate pyronaridine", "pyramax"],
+    "Dihydroartemisinin-piperaquine": ["dihydroartemisinin piperaquine", "dha-piperaquine", "eurartesim"],
+    "Artesunate-mefloquine": ["artesunate + mefloquine", "artesunate/mefloquine"],
+    "Artefenomel-ferroquine": ["artefenomel/ferroquine"],
+    "Sulfadoxine-pyrimethamine": ["sulfadoxine/pyrimethamine", "fansidar"],
+    "Artesunate": [],
+    "Mefloquine": [],
+    # 其他 Other
+    "Atorvastatin": ["lipitor"],
+    "Colchicine": [],
+    "Enalapril": [],
+    "Carvedilol": [],
+    "Sacubitril-valsartan": ["sacubitril/valsartan", "entresto"],
+    "Selexipag": [],
+    "Aspirin": ["acetylsalicylic acid"],
+    "Acetylcysteine": ["n-acetylcysteine"],
+    "Selenium": [],
+    "Ferrous sulfate": ["ferrous sulphate"],
+}
+
+# 缩写 -> 规范名，仅当整个条目就是缩写时才匹配（去掉剂量后）
+# Abbreviation -> canonical name. These mean other things in free text ("dec"
+# for decrease, "s/p" for status post), so they only count when they are the
+# whole entry, dose suffix aside, e.g. "PZQ 40 mg/kg" but not "PZQ dose dec".
+ABBREVIATIONS = {
+    "bnz": "Benznidazole",
+    "ssg": "Sodium stibogluconate",
+    "pzq": "Praziquantel",
+    "abz": "Albendazole",
+    "ivm": "Ivermectin",
+    "dec": "Diethylcarbamazine",
+    "s/p": "Sulfadoxine-pyrimethamine",
+    "nac": "Acetylcysteine",
+}
+
+# 剂量等后缀 Dose and form suffixes, stripped from names not in the dictionary
+DOSE_SUFFIX = re.compile(r'[\s,(]*\b\d+(?:[.,]\d+)?\s*(?:mg|milligrams?|mcg|µg|g|ml|iu)\b.*$', re.IGNORECASE)
+TRADEMARKS = re.compile(r'[®™]')
+# 条目末尾仅有的剂量 A dose that is all that follows the name, e.g. "40 mg/kg"
+TRAILING_DOSE = re.compile(r'[\s,(]*\d+(?:[.,]\d+)?\s*(?:mg|milligrams?|mcg|µg|g|ml|iu)\b'
+                           r'(?:\s*/\s*(?:kg|day|d|m2|dose))?[\s)]*$', re.IGNORECASE)
+
+
+class DrugMatcher:
+    """
+    多模式匹配 Finds every dictionary name in a text in one pass. Matches must
+    be whole words; where names overlap the leftmost, then longest, wins.
+    """
+
+    def __init__(self, synonyms=SYNONYMS):
+        self.canonical = {}
+        for name, others in synonyms.items():
+            for text in [name] + others:
+                self.canonical[text.lower()] = name
+        self.automaton = self._build_automaton()
+        if self.automaton is None:
+            # 最长的写法在前，使交替匹配取最长 Longest names first, so the alternation prefers them
+            names = sorted(self.canonical, key=len, reverse=True)
+            self.pattern = re.compile(r'(?<!\w)(?:' + '|'.join(map(re.escape, names)) + r')(?!\w)')
+
+    def _build_automaton(self):
+        try:
+            import ahocorasick
+        except ImportError:
+            return None
+        automaton = ahocorasick.Automaton()
+        for text in self.canonical:
+            automaton.add_word(text, len(text))
+        automaton.make_automaton()
+        return automaton
+
+    def _spans(self, text):
+        # (起点, 终点) Candidate (start, end) spans of dictionary names in lowercased text
+        if self.automaton is None:
+            return [match.span() for match in self.pattern.finditer(text)]
+        spans = []
+        for end, length in self.automaton.iter(text):
+            start, end = end - length + 1, end + 1
+            if (start == 0 or not text[start - 1].isalnum() and text[start - 1] != '_') and \
+                    (end == len(text) or not text[end].isalnum() and text[end] != '_'):
+                spans.append((start, end))
+        spans.sort(key=lambda span: (span[0], -span[1]))
+        kept, last_end = [], 0
+        for start, end in spans:
+            if start >= last_end:
+                kept.append((start, end))
+                last_end = end
+        return kept
+
+    def find(self, text):
+        """文本中的规范药名 Canonical names found in text, in order, without repeats"""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # 保持位置不变 Keep positions aligned when lowercasing changes a character's length
+            lowered = ''.join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+        names = [self.canonical[lowered[start:end]] for start, end in self._spans(lowered)]
+        return list(dict.fromkeys(names))
+
+
+@lru_cache(maxsize=1)
+def default_matcher():
+    return DrugMatcher()
+
+
+def clean_name(entry):
+    """词典外的名称 Tidy a name not in the dictionary: no dose suffix or trademark signs"""
+    name = DOSE_SUFFIX.sub('', TRADEMARKS.sub('', entry))
+    name = ' '.join(name.split()).strip(' ,;:-')
+    if not name:
+        return ' '.join(entry.split())
+    return name[0].upper() + name[1:]
+
+
+@lru_cache(maxsize=None)
+def normalize(entry):
+    """
+    规范化一条药物条目 Canonical drugs of one "Drug:" entry, as a tuple.
+    An entry that is only an abbreviation gives its drug; otherwise placebo
+    arms ("E1224 Placebo", "Placebo for posaconazole") count as placebo,
+    combinations give each component and names not in the dictionary are
+    tidied with clean_name. Memoised per distinct entry.
+    """
+    bare = ' '.join(TRAILING_DOSE.sub('', TRADEMARKS.sub('', entry)).split()).lower()
+    abbreviation = ABBREVIATIONS.get(bare)
+    if abbreviation is not None:
+        return (abbreviation,)
+    names = default_matcher().find(entry)
+    if PLACEBO in names:
+        return (PLACEBO,)
+    return tuple(names) if names else (clean_name(entry),)
+
+
+def normalize_drugs(table, column='drug', per_trial=True):
+    """
+    规范化药物表 Replace the raw entries in table[column] by their canonical
+    drugs, one row per drug, keeping the raw text as 'entry'. Each distinct
+    entry is normalised once. With per_trial a drug named by several entries
+    of the same trial (same row label) is kept once; without it every entry
+    keeps its drugs, for per-entry counts.
+    """
+    entries = table[column].astype(str)
+    canonical = pd.Series({entry: normalize(entry) for entry in pd.unique(entries)}, dtype=object)
+    table = table.assign(entry=entries.to_numpy(), **{column: entries.map(canonical).to_numpy()})
+    table = table.explode(column)
+    if not per_trial:
+        return table
+    repeated = pd.DataFrame({'row': table.index, column: table[column].to_numpy()}).duplicated().to_numpy()
+    return table[~repeated]
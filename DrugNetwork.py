@@ -0,0 +1,109 @@
+# 药物联合使用网络 Drug co-administration network
+# Which drugs are tested together in one trial. Reads the normalised long
+# table written by ExtractDrug.py and builds a sparse trial x drug incidence
+# matrix B (one 1 per trial and drug). The co-occurrence counts of every drug
+# pair are then the off-diagonal of B.T @ B, and its diagonal the trials per
+# drug, so no pairs are enumerated in Python and memory grows with the number
+# of co-occurring pairs, not with the square of the number of drugs.
+# lift = trials with both * trials / (trials with a * trials with b): above 1
+# the two drugs appear together more often than chance would give.
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from DrugNames import PLACEBO
+from ExtractDrug import TRIAL_DRUGS_FILE
+from Instrument import add_output, add_rows, measure
+
+EDGES_FILE = "CleanedData/drug_cooccurrence.csv"
+PARTNERS_FILE = "CleanedData/drug_partners.csv"
+TOP_K = 5
+
+
+def incidence_matrix(trial_drugs):
+    """
+    试验-药物关联矩阵 Sparse trial x drug 0/1 matrix of a (trial_id, drug)
+    table; returns (B, drug names), the drugs in alphabetical order.
+    """
+    trial_codes, _ = pd.factorize(trial_drugs["trial_id"])
+    drug_codes, drugs = pd.factorize(trial_drugs["drug"], sort=True)
+    B = sparse.csr_matrix((np.ones(len(trial_drugs), dtype=np.int32), (trial_codes, drug_codes)),
+                          shape=(trial_codes.max() + 1 if len(trial_codes) else 0, len(drugs)))
+    # 同一试验重复的药物只计一次 A drug listed twice for one trial counts once
+    B.data[:] = 1
+    return B, np.asarray(drugs, dtype=object)
+
+
+def cooccurrence(B, drugs):
+    """
+    共现边表 Edge list of every drug pair sharing at least one trial:
+    drug_a < drug_b, trials (shared trials) and lift, most shared first.
+    """
+    C = (B.T @ B).tocsr()
+    per_drug = C.diagonal()
+    pairs = sparse.triu(C, k=1).tocoo()
+    edges = pd.DataFrame({
+        "drug_a": drugs[pairs.row],
+        "drug_b": drugs[pairs.col],
+        "trials": pairs.data,
+        "lift": pairs.data * B.shape[0] / (per_drug[pairs.row].astype(float) * per_drug[pairs.col]),
+    })
+    return edges.sort_values(["trials", "lift", "drug_a", "drug_b"], ascending=[False, False, True, True],
+                             ignore_index=True)
+
+
+def top_partners(edges, k=TOP_K):
+    """每种药物的前k个伙伴 The k drugs most often tested with each drug"""
+    both = pd.concat([
+        edges.rename(columns={"drug_a": "drug", "drug_b": "partner"}),
+        edges.rename(columns={"drug_b": "drug", "drug_a": "partner"}),
+    ], ignore_index=True)
+    both = both.sort_values(["drug", "trials", "lift", "partner"], ascending=[True, False, False, True])
+    both["rank"] = both.groupby("drug", sort=False).cumcount() + 1
+    return both[both["rank"] <= k][["drug", "rank", "partner", "trials", "lift"]].reset_index(drop=True)
+
+
+def main(top_k=TOP_K, placebo=False):
+    """
+    药物网络 Drug co-administration network over every condition.
+    Placebo is left out unless placebo=True.
+    """
+    trial_drugs = pd.read_csv(TRIAL_DRUGS_FILE, usecols=["trial_id", "drug"], encoding="utf-8-sig")
+    add_rows(rows_in=len(trial_drugs))
+    if not placebo:
+        trial_drugs = trial_drugs[trial_drugs["drug"] != PLACEBO]
+
+    with measure("incidence matrix", rows_in=len(trial_drugs)) as step:
+        B, drugs = incidence_matrix(trial_drugs)
+        step["rows_out"] = B.nnz
+    with measure("co-occurrence", rows_in=B.nnz) as step:
+        edges = cooccurrence(B, drugs)
+        partners = top_partners(edges, top_k)
+        step["rows_out"] = len(edges)
+
+    edges.to_csv(EDGES_FILE, index=False, encoding="utf-8-sig")
+    partners.to_csv(PARTNERS_FILE, index=False, encoding="utf-8-sig")
+    add_rows(rows_out=len(edges))
+    add_output(EDGES_FILE, len(edges))
+    add_output(PARTNERS_FILE, len(partners))
+
+    trials_per_drug = np.diff(B.indptr)
+    print(f"Trials with drugs: {B.shape[0]} ({int((trials_per_drug >= 2).sum())} with two or more)")
+    print(f"Distinct drugs: {len(drugs)}")
+    print(f"Drug pairs tested together: {len(edges)}")
+    if len(edges):
+        print("\nMost frequent pairs:")
+        for row in edges.head(10).itertuples(index=False):
+            print(f"  {row.drug_a} + {row.drug_b}: {row.trials} trials (lift {row.lift:.1f})")
+    print(f"\nSaved {EDGES_FILE} and {PARTNERS_FILE}")
+    print("\n All DrugNetwork completed ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drug co-administration network")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="partners listed per drug")
+    parser.add_argument("--placebo", action="store_true", help="keep placebo as a drug")
+    args = parser.parse_args()
+    main(top_k=args.top_k, placebo=args.placebo)
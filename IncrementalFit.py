@@ -0,0 +1,241 @@
+# 增量训练 Out-of-core incremental training of the results-posted model
+# DataFit.py fits on the whole cleaned table in memory. Here the table is
+# streamed in chunks instead: a first pass collects the category vocabulary
+# and the class counts, then every chunk is one-hot encoded against that fixed
+# vocabulary and passed to SGDClassifier.partial_fit with log loss (a logistic
+# regression; averaged SGD with a constant step). The balanced class weights
+# of the batch model are given as sample weights from the class counts, and
+# alpha = 1 / (C * n) is the batch model's L2 penalty, so the coefficients are
+# comparable with logit_results.csv.
+# --update adds a new raw export (e.g. a week of trials) to the saved model
+# without reading the history again; values outside the vocabulary are ignored.
+#
+#   python IncrementalFit.py                   # train on CleanedData/cleaned_ictrp
+#   python IncrementalFit.py --update week.csv
+import argparse
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+
+from CleanData import DEFAULT_CHUNKSIZE, clean_chunk, read_raw
+from DataFit import (FEATURE_SETS, SPONSOR_MIN_COUNT, build_encoder, feature_columns, load_model,
+                     prepare_features, save_model)
+from DataStore import iter_table, split_multi
+from Instrument import measure
+from Score import check_columns, raw_columns
+
+MODEL_FILE = "CleanedData/incremental_model.pkl"
+RESULTS_FILE = "CleanedData/incremental_logit_results.csv"
+BATCH_RESULTS_FILE = "CleanedData/logit_results.csv"
+# 按trial_id哈希留出的评估比例 Share of trials held out for evaluation, chosen by trial_id hash
+HOLDOUT_PERCENT = 20
+# 原始文件中异常值过滤用到的列 Raw columns the outlier filter uses, read when present
+OUTLIER_COLUMNS = ["target_sample_size", "inclusion_age_min", "inclusion_age_max"]
+
+
+def holdout_mask(trial_ids):
+    """
+    留出集 True for held-out trials. The split depends only on the trial_id,
+    so it is the same in every pass and for trials added later.
+    """
+    hashes = pd.util.hash_pandas_object(trial_ids.astype(str), index=False).to_numpy()
+    return hashes % 100 < HOLDOUT_PERCENT
+
+
+def history_chunks(feature_set, chunksize=DEFAULT_CHUNKSIZE):
+    # 清洗后的数据表 (trial_id, features, target) chunks of the cleaned table
+    columns = ["trial_id"] + feature_columns(feature_set) + ["results_posted"]
+    for chunk in iter_table("cleaned_ictrp", columns=columns, chunksize=chunksize):
+        yield chunk["trial_id"], prepare_features(chunk, feature_set), chunk["results_posted"].astype(int).to_numpy()
+
+
+def raw_chunks(path, feature_set, chunksize=DEFAULT_CHUNKSIZE):
+    # 新的原始导出，按CleanData逐行规则清洗 A new raw export, cleaned with the row-local CleanData steps
+    columns = raw_columns(feature_columns(feature_set)) + ["results_ind"]
+    check_columns(path, columns)
+    header = pd.read_csv(path, nrows=0).columns
+    columns += [col for col in OUTLIER_COLUMNS if col in header]
+    for chunk in read_raw(path, chunksize=chunksize, usecols=columns):
+        chunk, _ = clean_chunk(chunk)
+        yield chunk["trial_id"], prepare_features(chunk, feature_set), chunk["results_posted"].astype(int).to_numpy()
+
+
+def scan(chunks, feature_set):
+    """
+    统计一遍 One pass over the training rows: value counts of every feature
+    column, class counts and the input dtypes. Returns (counts, classes, dtypes).
+    """
+    spec = FEATURE_SETS[feature_set]
+    counts = {col: Counter() for col in feature_columns(feature_set)}
+    classes = np.zeros(2, dtype=np.int64)
+    dtypes = None
+    for trial_ids, X, y in chunks:
+        train = ~holdout_mask(trial_ids)
+        X, y = X[train], y[train]
+        dtypes = X.dtypes.astype(str) if dtypes is None else dtypes
+        classes += np.bincount(y, minlength=2)
+        for col in spec["onehot"] + spec["sponsor"]:
+            counts[col].update(X[col].astype(object).value_counts().to_dict())
+        for col in spec["multi_hot"]:
+            counts[col].update(X[col].map(split_multi).explode().dropna().value_counts().to_dict())
+    return counts, classes, dtypes
+
+
+def build_vocabulary(counts, feature_set):
+    """固定的类别词表 Fixed vocabulary: every value seen, sponsors only when frequent"""
+    sponsor = set(FEATURE_SETS[feature_set]["sponsor"])
+    return {col: sorted(value for value, n in counter.items() if col not in sponsor or n >= SPONSOR_MIN_COUNT)
+            for col, counter in counts.items()}
+
+
+def balanced_weights(y, classes):
+    # 与class_weight='balanced'相同 Same weights as class_weight='balanced': n / (2 * n_class)
+    return (classes.sum() / (2 * classes))[y]
+
+
+def train(model, chunks, classes, epochs, seed=42):
+    """
+    增量更新 Run `epochs` passes of partial_fit over the training rows of
+    chunks() (a function returning a fresh chunk iterator), shuffling the
+    rows within each chunk. Returns the number of rows seen in one pass.
+    """
+    encoder, logit = model.named_steps["encoder"], model.named_steps["logit"]
+    rng = np.random.default_rng(seed)
+    rows = 0
+    for epoch in range(epochs):
+        rows = 0
+        for trial_ids, X, y in chunks():
+            train_rows = ~holdout_mask(trial_ids)
+            if not train_rows.any():
+                continue
+            design, y = encoder.transform(X[train_rows]), y[train_rows]
+            order = rng.permutation(len(y))
+            logit.partial_fit(design[order], y[order], classes=[0, 1],
+                              sample_weight=balanced_weights(y[order], classes))
+            rows += len(y)
+    return rows
+
+
+def holdout_auc(model, chunks):
+    """留出集AUC AUC on the held-out trials of chunks, None without both classes"""
+    scores, labels = [], []
+    for trial_ids, X, y in chunks:
+        held = holdout_mask(trial_ids)
+        if held.any():
+            scores.append(model.predict_proba(X[held])[:, 1])
+            labels.append(y[held])
+    labels = np.concatenate(labels) if labels else np.array([])
+    if len(np.unique(labels)) < 2:
+        return None
+    return roc_auc_score(labels, np.concatenate(scores))
+
+
+def coefficient_table(model):
+    results = pd.DataFrame({"feature": model.named_steps["encoder"].get_feature_names_out(),
+                            "coefficient": model.named_steps["logit"].coef_[0]})
+    return results.sort_values("coefficient", ascending=False)
+
+
+def compare_with_batch(results, path=BATCH_RESULTS_FILE):
+    # 与批量模型的系数比较 Compare with the coefficients of the batch model, when it has been run
+    if not os.path.exists(path):
+        return
+    merged = results.merge(pd.read_csv(path, encoding="utf-8-sig"), on="feature", suffixes=("", "_batch"))
+    if len(merged) < 2:
+        return
+    r = np.corrcoef(merged["coefficient"], merged["coefficient_batch"])[0, 1]
+    signs = (np.sign(merged["coefficient"]) == np.sign(merged["coefficient_batch"])).mean()
+    print(f"vs batch model ({len(merged)} shared features): correlation {r:.3f}, same sign {signs * 100:.0f}%")
+
+
+def report(model, metadata, auc, holdout="holdout"):
+    auc_text = "n/a" if auc is None else f"{auc:.4f}"
+    print(f"Model {metadata['version']}: {metadata['training_rows']} training trials, "
+          f"{len(metadata['encoded_features'])} features, {holdout} AUC {auc_text}")
+    results = coefficient_table(model)
+    results.to_csv(RESULTS_FILE, index=False, encoding="utf-8-sig")
+    compare_with_batch(results)
+
+
+def fit_history(feature_set="basic", C=1.0, epochs=10, eta0=0.01, chunksize=DEFAULT_CHUNKSIZE,
+                model_path=MODEL_FILE):
+    """从清洗后的全部数据训练 Train from the whole cleaned table, streamed"""
+    chunks = lambda: history_chunks(feature_set, chunksize)
+    with measure("vocabulary"):
+        counts, classes, dtypes = scan(chunks(), feature_set)
+    if classes.min() == 0:
+        raise ValueError(f"Need trials with and without posted results, found {classes.tolist()}")
+    vocabulary = build_vocabulary(counts, feature_set)
+    # 词表固定时编码器的拟合与数据无关 With a fixed vocabulary fitting the encoder does not depend on the rows
+    sample = pd.DataFrame({col: [vocabulary[col][0] if vocabulary[col] else ""] for col in dtypes.index})
+    model = Pipeline([
+        ("encoder", build_encoder(feature_set, vocabulary).fit(sample)),
+        # 恒定步长加平均收敛最接近批量解 Averaged SGD with a constant step came closest to the batch solution
+        ("logit", SGDClassifier(loss="log_loss", alpha=float(1 / (C * classes.sum())),
+                                learning_rate="constant", eta0=eta0, average=True, random_state=42)),
+    ])
+    with measure("partial fit", rows_in=int(classes.sum()) * epochs):
+        train(model, chunks, classes, epochs)
+    metadata = save_model(model, feature_set, dtypes, classes.sum(), classes[1] / classes.sum(), model_path,
+                          incremental={"C": C, "epochs": epochs, "class_counts": classes.tolist(),
+                                       "vocabulary": vocabulary, "updates": []})
+    report(model, metadata, holdout_auc(model, chunks()))
+    return model, metadata
+
+
+def update(path, epochs=None, chunksize=DEFAULT_CHUNKSIZE, model_path=MODEL_FILE):
+    """
+    用新数据更新 Update the saved model with the trials of a new raw export,
+    without reading the history: the class counts and alpha grow by the new
+    training rows and `epochs` (by default the training epochs) passes of
+    partial_fit run over the new rows only.
+    """
+    model, metadata = load_model(model_path)
+    state = metadata["incremental"]
+    feature_set, epochs = metadata["feature_set"], epochs or state["epochs"]
+    chunks = lambda: raw_chunks(path, feature_set, chunksize)
+    # 更新前先在新数据的留出集上评估 Score the new held-out trials before learning from them
+    before = holdout_auc(model, chunks())
+    counts, new_classes, _ = scan(chunks(), feature_set)
+    unseen = sum(n for col, counter in counts.items() for value, n in counter.items()
+                 if value not in set(state["vocabulary"][col]))
+    classes = np.array(state["class_counts"]) + new_classes
+    model.named_steps["logit"].set_params(alpha=float(1 / (state["C"] * classes.sum())))
+    with measure("partial fit", rows_in=int(new_classes.sum()) * epochs):
+        train(model, chunks, classes, epochs)
+    state = dict(state, class_counts=classes.tolist(),
+                 updates=state["updates"] + [{"file": os.path.basename(path), "rows": int(new_classes.sum())}])
+    metadata = save_model(model, feature_set, metadata["features"], classes.sum(), classes[1] / classes.sum(),
+                          model_path, incremental=state)
+    print(f"{path}: {int(new_classes.sum())} new training trials, {unseen} values outside the vocabulary ignored")
+    if before is not None:
+        print(f"AUC on its held-out trials before the update: {before:.4f}")
+    report(model, metadata, holdout_auc(model, chunks()), holdout="new trials' holdout")
+    return model, metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core incremental training of the results-posted model")
+    parser.add_argument("--update", metavar="CSV", help="update the saved model with a new raw ICTRP export")
+    parser.add_argument("--features", choices=sorted(FEATURE_SETS), default="basic")
+    parser.add_argument("--C", type=float, default=1.0, help="inverse L2 strength, as in LogisticRegression")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help="passes over the data (default 10; for --update, the training epochs)")
+    parser.add_argument("--eta0", type=float, default=0.01,
+                        help="SGD step size; small tables converge faster with a larger one")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--model", default=MODEL_FILE)
+    args = parser.parse_args()
+    if args.update:
+        update(args.update, args.epochs, args.chunksize, args.model)
+    else:
+        fit_history(args.features, args.C, args.epochs or 10, args.eta0, args.chunksize, args.model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# 性能记录 Performance instrumentation for the pipeline stages
+# Main.py wraps every stage in measure(); stages wrap their main sub-steps
+# (HTML cleaning, age validation, betweenness, figure saving, ...) the same
+# way. Each record keeps wall time, CPU time, peak RSS, rows in/out and bytes
+# read/written; repeated steps (e.g. one per chunk) are summed into one record.
+# Stages report their own rows with add_rows, and the rows of each file they
+# write with add_output.
+import csv
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+REPORT_FILE = "CleanedData/run_report.json"
+
+# 本进程的记录 Records collected in this process, keyed by "stage/step" path
+RECORDS = {}
+_STACK = []
+
+
+def _read_proc(path, key):
+    # 读取/proc中的计数，不可用时返回None Read a /proc counter, None when unavailable
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _io_bytes():
+    read = _read_proc("/proc/self/io", "rchar:")
+    written = _read_proc("/proc/self/io", "wchar:")
+    return read or 0, written or 0
+
+
+def _reset_peak_rss():
+    # Linux允许重置峰值RSS Linux can reset the peak RSS (VmHWM) of this process
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    peak_kb = _read_proc("/proc/self/status", "VmHWM:")
+    if peak_kb is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS返回字节，Linux返回KB macOS reports bytes, Linux kilobytes
+        peak_kb = peak / 1024 if sys.platform == "darwin" else peak
+    return peak_kb / 1024
+
+
+def _child_usage():
+    # 已结束子进程的CPU和峰值RSS CPU time and peak RSS of finished child processes
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak = usage.ru_maxrss / 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return usage.ru_utime + usage.ru_stime, peak / 1024
+
+
+def _merge(record):
+    existing = RECORDS.get(record["path"])
+    if existing is None:
+        RECORDS[record["path"]] = record
+        return
+    for key in ("wall_s", "cpu_s", "bytes_read", "bytes_written", "rows_in", "rows_out", "calls"):
+        if record.get(key) is not None:
+            existing[key] = (existing.get(key) or 0) + record[key]
+    existing["peak_rss_mb"] = max(existing.get("peak_rss_mb") or 0, record.get("peak_rss_mb") or 0)
+    if record.get("outputs"):
+        existing.setdefault("outputs", {}).update(record["outputs"])
+
+
+@contextmanager
+def measure(name, rows_in=None, children=False):
+    """
+    记录一个阶段或子步骤 Record one stage or sub-step.
+    Nested calls become "stage/step" records. Yields the record so the
+    caller can set rows_in / rows_out. With children=True the CPU time and
+    peak RSS are those of the child processes waited for inside the block
+    (a stage run with subprocess); the peak is the largest of any child so far.
+    """
+    if _STACK:
+        # 子步骤开始前先记下外层的峰值 Fold the outer peak in before resetting it
+        _STACK[-1]["peak_rss_mb"] = max(_STACK[-1]["peak_rss_mb"], _peak_rss_mb())
+    _reset_peak_rss()
+    path = "/".join([r["name"] for r in _STACK] + [name])
+    record = {"path": path, "name": name, "calls": 1, "rows_in": rows_in, "rows_out": None,
+              "peak_rss_mb": 0.0}
+    read_start, written_start = _io_bytes()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    child_cpu_start = _child_usage()[0]
+    _STACK.append(record)
+    try:
+        yield record
+    finally:
+        _STACK.pop()
+        read_end, written_end = _io_bytes()
+        record["wall_s"] = time.perf_counter() - wall_start
+        record["cpu_s"] = time.process_time() - cpu_start
+        record["peak_rss_mb"] = max(record["peak_rss_mb"], _peak_rss_mb())
+        if children:
+            child_cpu, child_peak = _child_usage()
+            record["cpu_s"] = child_cpu - child_cpu_start
+            record["peak_rss_mb"] = child_peak
+        record["bytes_read"] = read_end - read_start
+        record["bytes_written"] = written_end - written_start
+        if _STACK:
+            _STACK[-1]["peak_rss_mb"] = max(_STACK[-1]["peak_rss_mb"], record["peak_rss_mb"])
+        _merge(record)
+
+
+def add_rows(rows_in=0, rows_out=0):
+    """给当前记录累加行数 Add row counts to the innermost active record"""
+    if not _STACK:
+        return
+    record = _STACK[-1]
+    if rows_in:
+        record["rows_in"] = (record["rows_in"] or 0) + rows_in
+    if rows_out:
+        record["rows_out"] = (record["rows_out"] or 0) + rows_out
+
+
+def add_output(path, rows):
+    """记录输出文件的行数 Record the data rows the running stage wrote to one file"""
+    if not _STACK:
+        return
+    _STACK[0].setdefault("outputs", {})[path] = int(rows)
+
+
+def add_record(name, **fields):
+    """记录一个未测量的步骤 Add a step that was not measured, e.g. a cache restore"""
+    RECORDS[name] = dict({"path": name, "name": name, "calls": 1}, **fields)
+
+
+def csv_rows(paths):
+    """
+    CSV文件的数据行数 Data rows (header excluded) of each CSV file that
+    exists, by path; for stages run as scripts, which cannot report their own
+    """
+    rows = {}
+    for path in paths:
+        if path.endswith(".csv") and os.path.exists(path):
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                rows[path] = max(sum(1 for _ in csv.reader(f)) - 1, 0)
+    return rows
+
+
+def merge(records):
+    """合并其他进程的记录 Merge records sent back from a worker process"""
+    for item in records:
+        _merge(item)
+
+
+def collect():
+    """取出并清空本进程的记录 Take (and clear) the records of this process"""
+    records = list(RECORDS.values())
+    RECORDS.clear()
+    return records
+
+
+def write_report(records, path=REPORT_FILE, **meta):
+    """写入JSON运行报告 Write the machine-readable run report"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    report = dict(meta, created=time.strftime("%Y-%m-%dT%H:%M:%S"), steps=records)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return path
@@ -2,31 +2,189 @@
 # NTD Clinical Trials Analysis - Main Entry Point
 # Group 16 - Lancaster University
 
+import argparse
+import cProfile
+import importlib
+import io
 import subprocess
 import sys
 import time
 import os
+import traceback
+import Instrument
+import Render
+import StageCache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stderr, redirect_stdout
 
-# 脚本执行顺序 Script execution order
-SCRIPTS = [
-    "CleanData.py",  # 必须第一个运行 Must run first
-    "DataFit.py",
-    "ExtractDrug.py",
-    "Network.py",
-    "visualization.py",
-    "pregnant.py",
-]
+# 阶段依赖图 Stage dependency graph.
+# deps: stages that must run first; code/inputs: files (besides outputs of
+# deps) that the stage reads, used for the artifact cache fingerprint, with
+# the local modules the script imports added by StageCache.local_imports;
+# outputs: files it writes, restored from the cache when nothing changed.
+STAGES = {
+    "CleanData": {  # 必须第一个运行 Must run first
+        "script": "CleanData.py",
+        "deps": [],
+        "code": [],
+        "inputs": ["ictrp_data.csv"],
+        "outputs": [
+            "CleanedData/cleaned_ictrp.csv", "CleanedData/cleaned_ictrp.parquet",
+            "CleanedData/published_trials.csv",
+            "CleanedData/trial_countries.csv", "CleanedData/trial_countries.parquet",
+            "CleanedData/condition_index.npz",
+            "CleanedData/country_statistics.csv", "CleanedData/country_Industry.csv",
+            "CleanedData/published_country_statistics.csv",
+        ],
+    },
+    "DataFit": {
+        "script": "DataFit.py",
+        "deps": ["CleanData"],
+        "code": [],
+        "inputs": [],
+        "outputs": ["CleanedData/logit_results.csv", "CleanedData/logit_model.pkl",
+                    "CleanedDataPlt/coefficients.jpg"],
+    },
+    "ExtractDrug": {
+        "script": "ExtractDrug.py",
+        "deps": ["CleanData"],
+        "code": [],
+        "inputs": [],
+        "outputs": [
+            "CleanedData/chagas.csv", "CleanedData/chagas_drugs.csv",
+            "CleanedData/chagas_drug_trends.csv", "CleanedData/trial_drugs.csv",
+            "CleanedData/condition_drugs.csv", "CleanedData/condition_drug_trends.csv",
+            "CleanedDataPlt/drug_trends.jpg",
+        ],
+    },
+    "DrugNetwork": {
+        "script": "DrugNetwork.py",
+        "deps": ["ExtractDrug"],
+        "code": [],
+        "inputs": [],
+        "outputs": ["CleanedData/drug_cooccurrence.csv", "CleanedData/drug_partners.csv"],
+    },
+    "Network": {
+        "script": "Network.py",
+        "deps": ["CleanData"],
+        "code": [],
+        "inputs": [],
+        "outputs": ["CleanedData/network_statistics.csv", "CleanedDataPlt/network.jpg"],
+    },
+    "visualization": {
+        "script": "visualization.py",
+        "deps": ["CleanData"],
+        "code": [],
+        "inputs": ["countries.geo.json"],
+        "outputs": [
+            "CleanedData/country_Industry_HighBurden.csv", "CleanedData/industry_burden.csv",
+            "CleanedDataPlt/sponsor_distribution.jpg", "CleanedDataPlt/industry_region.jpg",
+            "CleanedDataPlt/world_heatmap.jpg", "CleanedDataPlt/industry_burden.jpg",
+        ],
+    },
+    "pregnant": {
+        "script": "pregnant.py",
+        "deps": ["CleanData"],
+        "code": [],
+        "inputs": [],
+        "outputs": [
+            "CleanedDataPlt/pregnancy_inclusion.png", "CleanedDataPlt/inclusion_disease.png",
+            "CleanedDataPlt/inclusion_phase.png",
+        ],
+    },
+}
 
 
-def run_script(script_name):
+# 图片输出目录 Where the figures go; --data-only skips everything written here
+FIGURE_DIR = "CleanedDataPlt/"
+
+
+def draws_figures(name):
+    return any(path.startswith(FIGURE_DIR) for path in STAGES[name]["outputs"])
+
+
+def stage_outputs(name, figures=True):
+    """阶段的输出文件 Output files of a stage, without the figures when figures=False"""
+    return [path for path in STAGES[name]["outputs"] if figures or not path.startswith(FIGURE_DIR)]
+
+
+def stage_order(stages=STAGES):
+    """拓扑排序 Topological order of the stages, keeping declaration order for ties"""
+    order, done = [], set()
+    pending = list(stages)
+    while pending:
+        ready = [name for name in pending if all(dep in done for dep in stages[name]["deps"])]
+        if not ready:
+            raise ValueError(f"Stage dependency cycle among: {', '.join(pending)}")
+        for name in ready:
+            order.append(name)
+            done.add(name)
+            pending.remove(name)
+    return order
+
+
+def stage_fingerprints(stages, figures=True):
+    """每个阶段的缓存指纹 Cache fingerprint of every stage, upstream first"""
+    fingerprints = {}
+    for name in stage_order():
+        if name not in stages:
+            continue
+        spec = STAGES[name]
+        upstream = [fingerprints[dep] for dep in spec["deps"] if dep in fingerprints]
+        # 只写数据或预览的运行和完整运行分开缓存
+        # Data-only and preview runs are cached apart from full runs
+        variant = ""
+        if draws_figures(name):
+            variant = "data-only" if not figures else "preview" if Render.SETTINGS["preview"] else ""
+        code = StageCache.local_imports(spec["script"]) + spec["code"]
+        fingerprints[name] = StageCache.fingerprint(code + spec["inputs"], upstream, variant)
+    return fingerprints
+
+
+PROFILE_DIR = "profiles"
+
+
+def profile_path(name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{name}.prof")
+
+
+def restore_cached(name, fp):
+    """缓存命中时恢复输出 Restore a stage's outputs when its fingerprint is cached"""
+    start = time.perf_counter()
+    if StageCache.restore(name, fp):
+        Instrument.add_record(name, cached=True, wall_s=time.perf_counter() - start)
+        print(f"\n✓ {name} unchanged, restored from cache ({fp[:12]})")
+        return True
+    return False
+
+
+def count_outputs(name, step):
+    # 子进程中的阶段无法报告，逐个文件数CSV行 A stage run as a script cannot report its
+    # rows, so each CSV output is counted on its own
+    step["outputs"] = Instrument.csv_rows(STAGES[name]["outputs"])
+
+
+def run_script(script_name, name=None, profile=False, figures=True):
     """运行单个脚本 Run a single script"""
     print(f"\n{'=' * 50}")
     print(f"▶ Running: {script_name}")
     print('=' * 50)
 
+    name = name or os.path.splitext(script_name)[0]
+    command = [sys.executable, script_name]
+    if profile:
+        command = [sys.executable, "-m", "cProfile", "-o", profile_path(name), script_name]
+    if not figures and draws_figures(name):
+        command.append("--data-only")
+    elif draws_figures(name):
+        command += ["--render-workers", str(Render.SETTINGS["workers"])]
+        command += ["--preview"] * Render.SETTINGS["preview"] + ["--force-render"] * Render.SETTINGS["force"]
     start = time.time()
     try:
-        subprocess.run([sys.executable, script_name], check=True)
+        with Instrument.measure(name, children=True) as step:
+            subprocess.run(command, check=True)
+            count_outputs(name, step)
         print(f"✓ {script_name} done ({time.time() - start:.2f}s)")
         return True
     except subprocess.CalledProcessError:
@@ -37,7 +195,140 @@ def run_script(script_name):
         return False
 
 
+def run_stage(name, shared=None, profile=False, figures=True):
+    """
+    在当前进程中运行阶段 Run a stage in this process.
+    Stages that depend on CleanData get the cleaned table loaded once and
+    shared through `shared`, instead of re-reading it themselves; with
+    shared=None each stage loads its own columns. With profile=True the
+    stage's cProfile stats are written to profiles/<stage>.prof; with
+    figures=False plotting stages only write their data outputs.
+    """
+    print(f"\n{'=' * 50}")
+    print(f"▶ Running: {name}")
+    print('=' * 50)
+
+    start = time.time()
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if shared is not None and "CleanData" in STAGES[name]["deps"] and "cleaned" not in shared:
+            from DataStore import load_cleaned
+            with Instrument.measure("shared cleaned table"):
+                shared["cleaned"] = load_cleaned(stage="Main")
+        with Instrument.measure(name):
+            module = importlib.import_module(name)
+            if profiler is not None:
+                profiler.enable()
+            try:
+                kwargs = {} if figures or not draws_figures(name) else {"figures": False}
+                if shared is not None and "CleanData" in STAGES[name]["deps"]:
+                    module.main(df=shared["cleaned"], **kwargs)
+                else:
+                    module.main(**kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    profiler.dump_stats(profile_path(name))
+        print(f"✓ {name} done ({time.time() - start:.2f}s)")
+        return True
+    except Exception:
+        traceback.print_exc()
+        print(f"✗ {name} failed")
+        return False
+
+
+def run_stage_captured(name, profile=False, figures=True, render_settings=None):
+    """
+    进程池任务：运行阶段并收集输出 Pool task: run a stage, return
+    (ok, its log, its instrumentation records).
+    """
+    # 丢弃fork时继承的父进程记录 Drop records inherited from the parent on fork
+    Instrument.collect()
+    if render_settings:
+        Render.configure(**render_settings)
+    log = io.StringIO()
+    with redirect_stdout(log), redirect_stderr(log):
+        ok = run_stage(name, profile=profile, figures=figures)
+    return ok, log.getvalue(), Instrument.collect()
+
+
+def ready_stages(pending, done, stages):
+    # 跳过的阶段不阻塞依赖它的阶段 Skipped stages do not block their dependents
+    return [name for name in pending
+            if all(dep in done or dep not in stages for dep in STAGES[name]["deps"])]
+
+
+def run_parallel(stages, jobs, fingerprints=None, profile=False, figures=True):
+    """
+    并行运行 Run stages in a bounded process pool as soon as their
+    dependencies finish. Each stage's output is printed in one block when it
+    completes; the first failure stops new stages from starting. Stages
+    whose fingerprint is cached are restored instead of submitted.
+    Returns (success, failed).
+    """
+    success, failed = 0, 0
+    done, running = set(), {}
+    pending = list(stages)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            # 缓存恢复可能让更多阶段就绪，循环到没有变化为止
+            # A cache restore can make more stages ready, so repeat until nothing changes
+            progressed = not failed
+            while progressed:
+                progressed = False
+                for name in ready_stages(pending, done, stages):
+                    if fingerprints and restore_cached(name, fingerprints[name]):
+                        success += 1
+                        done.add(name)
+                        pending.remove(name)
+                        progressed = True
+                    # 只提交空闲进程数量的阶段，失败时不会有排队任务
+                    # Only submit as many stages as there are free workers, so nothing is queued on failure
+                    elif len(running) < jobs:
+                        running[pool.submit(run_stage_captured, name, profile, figures, Render.SETTINGS)] = name
+                        pending.remove(name)
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                ok, log, records = future.result()
+                print(log, end="")
+                Instrument.merge(records)
+                if ok:
+                    success += 1
+                    done.add(name)
+                    if fingerprints:
+                        StageCache.store(name, fingerprints[name], stage_outputs(name, figures))
+                else:
+                    failed += 1
+    return success, failed
+
+
 def main():
+    parser = argparse.ArgumentParser(description="NTD Clinical Trials Analysis Pipeline")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="run every stage as a separate Python process (old behaviour)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="run independent stages at the same time in a process pool")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="maximum number of stages running at once with --parallel")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run every stage, without reading or writing the artifact cache")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="delete the artifact cache before running, forcing every stage to run")
+    parser.add_argument("--data-only", action="store_true",
+                        help="only write the CleanedData tables: no plotting imports, no figures")
+    Render.add_arguments(parser)
+    parser.add_argument("--profile", action="store_true",
+                        help=f"write cProfile stats of every stage that runs to {PROFILE_DIR}/<stage>.prof")
+    args = parser.parse_args()
+    Render.configure_from(args)
+
+    if args.clear_cache:
+        StageCache.clear()
+        print("Artifact cache cleared")
+
     print("\n" + "=" * 50)
     print("  NTD Clinical Trials Analysis Pipeline")
     print("  Group 16 - Lancaster University")
@@ -45,24 +336,54 @@ def main():
 
     total_start = time.time()
     success, failed = 0, 0
+    shared = {}
 
-    for script in SCRIPTS:
-        if not os.path.exists(script):
-            print(f"⚠ {script} not found, skipping")
-            continue
-        if run_script(script):
-            success += 1
+    figures = not args.data_only
+    stages = []
+    for name in stage_order():
+        if not os.path.exists(STAGES[name]["script"]):
+            print(f"⚠ {STAGES[name]['script']} not found, skipping")
+        elif not stage_outputs(name, figures):
+            # 只输出图片的阶段 Stages that only draw figures have nothing to do
+            print(f"⚠ {name} only draws figures, skipping (--data-only)")
         else:
-            failed += 1
+            stages.append(name)
+    fingerprints = None if args.no_cache else stage_fingerprints(stages, figures)
+
+    if args.parallel:
+        success, failed = run_parallel(stages, args.jobs, fingerprints, args.profile, figures)
+        if failed:
             print("停止执行 Stopping due to error")
-            break
+    else:
+        for name in stages:
+            if fingerprints and restore_cached(name, fingerprints[name]):
+                success += 1
+                continue
+            if args.subprocess:
+                ok = run_script(STAGES[name]["script"], name, args.profile, figures)
+            else:
+                ok = run_stage(name, shared, args.profile, figures)
+            if ok:
+                success += 1
+                if fingerprints:
+                    StageCache.store(name, fingerprints[name], stage_outputs(name, figures))
+            else:
+                failed += 1
+                print("停止执行 Stopping due to error")
+                break
+
+    # 运行报告 Run report
+    mode = "parallel" if args.parallel else "subprocess" if args.subprocess else "in-process"
+    report = Instrument.write_report(Instrument.collect(), mode=mode, data_only=args.data_only,
+                                     success=success, failed=failed, total_s=time.time() - total_start)
 
     # 总结 Summary
     print(f"\n{'=' * 50}")
     print(f"  Done! Success: {success}, Failed: {failed}")
     print(f"  Total time: {time.time() - total_start:.2f}s")
+    print(f"  Run report: {report}")
     print("=" * 50)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,132 @@
+# 图片渲染 Figure rendering shared by the analysis stages
+# A stage declares each figure with figure(path, plot, *data): the data are
+# the aggregates the figure shows and plot(*data) draws them and returns the
+# matplotlib Figure. render() hashes the data, the plot function's source and
+# the savefig style; figures whose hash matches the last render (and whose
+# file is still the one rendered then) are skipped, the rest are drawn and
+# saved in a process pool.
+import hashlib
+import inspect
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from Instrument import measure
+from StageCache import file_digest
+
+HASH_DIR = os.path.join(".cache", "figures")
+PREVIEW_DPI = 72
+
+# 运行选项，由Main.py或命令行设置 Run options, set by Main.py or the command line
+SETTINGS = {"workers": os.cpu_count() or 1, "preview": False, "force": False}
+
+
+def add_arguments(parser):
+    """命令行渲染选项 Add the rendering options to a script's argument parser"""
+    parser.add_argument("--preview", action="store_true",
+                        help=f"draw figures quickly at {PREVIEW_DPI} dpi (not remembered as rendered)")
+    parser.add_argument("--render-workers", type=int, default=SETTINGS["workers"],
+                        help="processes used to draw figures")
+    parser.add_argument("--force-render", action="store_true",
+                        help="redraw every figure even when its data did not change")
+
+
+def configure_from(args):
+    configure(workers=args.render_workers, preview=args.preview, force=args.force_render)
+
+
+def configure(**options):
+    """设置渲染选项 Set workers (process count), preview (low dpi) or force (ignore hashes)"""
+    unknown = set(options) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown render options: {', '.join(sorted(unknown))}")
+    SETTINGS.update(options)
+
+
+def figure(path, plot, *data, inputs=(), **savefig_kwargs):
+    """
+    声明一张图 Declare a figure: plot(*data) draws it and returns the Figure,
+    which is saved to path with savefig_kwargs. inputs are extra files the
+    plot reads (e.g. a map), hashed with the data.
+    """
+    return {"path": path, "plot": plot, "data": data, "inputs": list(inputs), "style": savefig_kwargs}
+
+
+def figure_hash(spec):
+    """图的指纹 Hash of a figure's data, plot code, input files and style"""
+    digest = hashlib.sha256()
+    digest.update(inspect.getsource(spec["plot"]).encode())
+    digest.update(pickle.dumps((spec["data"], sorted(spec["style"].items())), protocol=4))
+    for path in spec["inputs"]:
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def _hash_path(path):
+    return os.path.join(HASH_DIR, path.replace("/", "__").replace("\\", "__") + ".sha256")
+
+
+def _last_hash(path):
+    # 图片文件被替换过（例如从阶段缓存恢复）时不算
+    # Only valid while the file is the one rendered then (not e.g. restored from the stage cache)
+    if not os.path.exists(path) or not os.path.exists(_hash_path(path)):
+        return None
+    with open(_hash_path(path), encoding="utf-8") as f:
+        fp, rendered = (f.read().split() + [None, None])[:2]
+    return fp if rendered == file_digest(path) else None
+
+
+def _remember(path, fp):
+    os.makedirs(HASH_DIR, exist_ok=True)
+    if fp is None:
+        if os.path.exists(_hash_path(path)):
+            os.remove(_hash_path(path))
+        return
+    with open(_hash_path(path), "w", encoding="utf-8") as f:
+        f.write(f"{fp} {file_digest(path)}\n")
+
+
+def draw(spec, preview=False):
+    """绘制并保存一张图 Draw and save one figure (runs in a pool worker)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    style = dict(spec["style"])
+    if preview:
+        style["dpi"] = PREVIEW_DPI
+    fig = spec["plot"](*spec["data"])
+    os.makedirs(os.path.dirname(spec["path"]) or ".", exist_ok=True)
+    fig.savefig(spec["path"], **style)
+    plt.close(fig)
+    return spec["path"]
+
+
+def render(figures):
+    """
+    渲染声明的图 Render the declared figures, skipping unchanged ones.
+    Previews are drawn at PREVIEW_DPI and not remembered, so the next full
+    render redraws them. Returns the paths that were drawn.
+    """
+    preview, force = SETTINGS["preview"], SETTINGS["force"]
+    pending = []
+    for spec in figures:
+        fp = figure_hash(spec)
+        if not force and not preview and fp == _last_hash(spec["path"]):
+            print(f"{spec['path']} unchanged, skipped")
+            continue
+        pending.append((spec, fp))
+    if not pending:
+        return []
+
+    workers = min(SETTINGS["workers"], len(pending))
+    with measure("figure saving"):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(draw, spec, preview) for spec, _ in pending]
+                drawn = [future.result() for future in futures]
+        else:
+            drawn = [draw(spec, preview) for spec, _ in pending]
+    for spec, fp in pending:
+        _remember(spec["path"], None if preview else fp)
+    return drawn
@@ -0,0 +1,79 @@
+# 结果发布可能性打分 Score trials for their likelihood of posting results
+# Loads the model saved by DataFit.py and streams a raw ICTRP export in
+# chunks: each chunk is cleaned with the row-local CleanData steps, encoded
+# and scored, and its (trial_id, probability) rows are appended to the
+# output. Only the columns the model needs are read, and memory is bounded by
+# the chunk size whatever the file size.
+#
+#   python Score.py new_trials.csv --out CleanedData/scores.csv
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from CleanData import DEFAULT_CHUNKSIZE, clean_chunk, read_raw
+from DataFit import MODEL_FILE, load_model, prepare_features
+from Instrument import add_rows, measure
+
+SCORES_FILE = "CleanedData/scores.csv"
+# clean_chunk总是需要的原始列 Raw columns clean_chunk always needs;
+# Year, sponsor_category and income_level are derived from them
+CLEAN_INPUTS = ["trial_id", "date_registration", "primary_sponsor", "country_codes"]
+DERIVED = {"Year", "sponsor_category", "income_level"}
+
+
+def raw_columns(features):
+    """模型需要的原始列 Raw columns to read for the model's input features"""
+    return CLEAN_INPUTS + [col for col in features if col not in DERIVED and col not in CLEAN_INPUTS]
+
+
+def check_columns(path, columns):
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f"{path} lacks columns the model needs: {', '.join(missing)}")
+
+
+def score_file(path, out_path=SCORES_FILE, model_path=MODEL_FILE, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    流式打分 Score every trial of a raw export, chunk by chunk.
+    Writes trial_id and probability (of posting results) to out_path;
+    returns (rows scored, model metadata).
+    """
+    model, metadata = load_model(model_path)
+    columns = raw_columns(metadata["features"])
+    check_columns(path, columns)
+    rows = 0
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with measure("scoring") as step, open(out_path, "w", encoding="utf-8", newline="") as out:
+        for i, chunk in enumerate(read_raw(path, chunksize=chunksize, usecols=columns)):
+            chunk, _ = clean_chunk(chunk)
+            X = prepare_features(chunk, metadata["feature_set"])
+            scores = pd.DataFrame({"trial_id": chunk["trial_id"].to_numpy(),
+                                   "probability": model.predict_proba(X)[:, 1]})
+            scores.to_csv(out, index=False, header=(i == 0))
+            rows += len(scores)
+            add_rows(rows_in=len(chunk), rows_out=len(scores))
+    return rows, metadata, step
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score trials for their likelihood of posting results")
+    parser.add_argument("trials", help="raw ICTRP export (CSV) of the trials to score")
+    parser.add_argument("--out", default=SCORES_FILE, help="output CSV of trial_id, probability")
+    parser.add_argument("--model", default=MODEL_FILE, help="model saved by DataFit.py")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows, metadata, step = score_file(args.trials, args.out, args.model, args.chunksize)
+    seconds = time.perf_counter() - start
+    print(f"Model {metadata['version']} ({metadata['feature_set']} features, "
+          f"fitted on {metadata['training_rows']} trials)")
+    print(f"{rows} trials scored in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s, "
+          f"peak {step['peak_rss_mb']:.0f} MB) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
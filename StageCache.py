@@ -0,0 +1,149 @@
+# 阶段缓存 Content-addressed artifact cache for the pipeline stages
+# A stage's fingerprint hashes its code files, its external input files,
+# Mapping.py and the fingerprints of the stages it depends on. When a stage
+# runs with a fingerprint seen before, Main.py restores its outputs from
+# .cache/ instead of running it again. Only the KEEP_ENTRIES most recently
+# stored or restored entries of each stage are kept.
+import ast
+import hashlib
+import json
+import os
+import shutil
+
+CACHE_DIR = os.path.join(".cache", "stages")
+# 所有阶段共用的常量 Constants every stage depends on
+SHARED_CODE = ["Mapping.py"]
+# 每个阶段保留的缓存条目数 Cache entries kept per stage
+KEEP_ENTRIES = 3
+
+
+def file_digest(path):
+    """文件内容的SHA-256 SHA-256 of a file's content, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def local_imports(script):
+    """
+    脚本导入的本地模块 The script and every module of its directory it imports,
+    directly or through other local modules (imports inside functions
+    included), so a stage's fingerprint follows its code without a hand-kept
+    list.
+    """
+    folder = os.path.dirname(script)
+    found, pending = [], [script]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(path):
+            continue
+        found.append(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            pending += [os.path.join(folder, name.split(".")[0] + ".py") for name in names]
+    return sorted(found)
+
+
+def fingerprint(files, upstream=(), variant=""):
+    """
+    计算阶段指纹 Fingerprint a stage from its files, the fingerprints of the
+    stages it depends on and a variant string (options that change outputs).
+    Missing files hash as missing rather than failing.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(set(files) | set(SHARED_CODE)):
+        digest.update(path.encode())
+        digest.update(file_digest(path).encode() if os.path.exists(path) else b"missing")
+    for fp in upstream:
+        digest.update(fp.encode())
+    digest.update(variant.encode())
+    return digest.hexdigest()
+
+
+def _entry_dir(stage, fp):
+    return os.path.join(CACHE_DIR, stage, fp)
+
+
+def _manifest(entry):
+    with open(os.path.join(entry, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def restore(stage, fp):
+    """从缓存恢复输出 Copy a cached stage's outputs back; False on a cache miss"""
+    entry = _entry_dir(stage, fp)
+    manifest_path = os.path.join(entry, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return False
+    for path in _manifest(entry)["outputs"]:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        shutil.copy2(os.path.join(entry, "files", path), path)
+    # 标记为最近使用 Mark the entry as recently used, so eviction keeps it
+    os.utime(manifest_path)
+    return True
+
+
+def _entries(stage):
+    # 阶段的缓存条目，最近使用的在前 A stage's cache entries, most recently used first
+    folder = os.path.join(CACHE_DIR, stage)
+    entries = [os.path.join(folder, name) for name in os.listdir(folder)] if os.path.isdir(folder) else []
+    entries = [entry for entry in entries if os.path.exists(os.path.join(entry, "manifest.json"))]
+    return sorted(entries, key=lambda entry: os.path.getmtime(os.path.join(entry, "manifest.json")), reverse=True)
+
+
+def _cached_copies(stage):
+    # 已缓存文件按内容索引 Files already in the stage's cache, by content digest
+    copies = {}
+    for entry in _entries(stage):
+        for path, digest in _manifest(entry).get("digests", {}).items():
+            copies.setdefault(digest, os.path.join(entry, "files", path))
+    return copies
+
+
+def store(stage, fp, outputs, keep=KEEP_ENTRIES):
+    """
+    保存阶段输出 Save the outputs a stage produced under its fingerprint and
+    evict all but the keep most recent entries of the stage. An output
+    identical to one already cached for the stage is hard-linked to it
+    instead of copied; the working file itself is always copied, since the
+    stages rewrite their outputs in place.
+    """
+    entry = _entry_dir(stage, fp)
+    cached = _cached_copies(stage)
+    os.makedirs(entry, exist_ok=True)
+    produced = [path for path in outputs if os.path.exists(path)]
+    digests = {}
+    for path in produced:
+        target = os.path.join(entry, "files", path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        digests[path] = file_digest(path)
+        source = cached.get(digests[path])
+        if source is not None:
+            try:
+                os.link(source, target)
+                continue
+            except OSError:
+                # 不支持硬链接时复制 Copied where hard links are not supported
+                pass
+        shutil.copy2(path, target)
+    with open(os.path.join(entry, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"stage": stage, "fingerprint": fp, "outputs": produced, "digests": digests}, f, indent=2)
+    for old in _entries(stage)[keep:]:
+        if old != entry:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def clear():
+    """清空缓存 Remove every cached stage output"""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,237 @@
+# 倒排索引 Inverted index over the condition and title fields
+# CleanData writes CleanedData/condition_index.npz next to the cleaned table:
+# every lowercased word token of standardised_condition, original_condition
+# and study_title, mapped to the sorted row positions (in cleaned_ictrp) of
+# the trials containing it. A substring search first scans the vocabulary,
+# which is far smaller than the table, for tokens containing the term and
+# then takes the union of their posting lists. That is exactly the rows
+# str.contains(term, case=False) would find for a single-word term; longer
+# terms are checked with str.contains on the candidate rows only.
+#
+#   python TextIndex.py chagas schistosomiasis "visceral leishmaniasis"
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+INDEX_FILE = "CleanedData/condition_index.npz"
+INDEX_FIELDS = ["standardised_condition", "original_condition", "study_title"]
+TOKEN_PATTERN = re.compile(r'\w+')
+# 合并时每块的键数 Keys per block when merging the spilled runs (8 bytes each)
+MERGE_BLOCK = 1 << 22
+
+
+def sorted_unique(keys):
+    # 排序去重 Sort and drop repeats; faster than np.unique for large integer arrays
+    keys = np.sort(keys)
+    return keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if len(keys) else keys
+
+
+class TextIndexWriter:
+    """
+    分块建立索引 Builds the index from the cleaned table chunk by chunk, in
+    the order the rows are written; close() saves it. Each chunk's sorted
+    (word, row) keys are spilled to a run file in a temporary directory and
+    close() merges the runs block by block into a memory-mapped posting
+    array, so memory stays bounded by the chunk size and the merge block,
+    not by the table.
+    """
+
+    def __init__(self, path=INDEX_FILE, fields=INDEX_FIELDS, merge_block=MERGE_BLOCK):
+        self.path = path
+        self.fields = fields
+        self.merge_block = merge_block
+        self.rows = 0
+        self.first_id, self.last_id = "", ""
+        self._ids = {}
+        self._runs = []
+        self._tmp = tempfile.mkdtemp(prefix="condition_index_", dir=os.path.dirname(path) or ".")
+
+    def _word_ids(self, words):
+        # 全局词编号 Global id of each word, new words numbered as they come
+        return np.array([self._ids.setdefault(word, len(self._ids)) for word in words], dtype=np.int64)
+
+    def write(self, df):
+        positions = np.arange(self.rows, self.rows + len(df), dtype=np.int64)
+        keys = []
+        for field in [f for f in self.fields if f in df.columns]:
+            # 每个不同的文本只分词一次 Tokenize each distinct text once
+            codes, texts = pd.factorize(df[field].astype(object))
+            tokens = pd.Series(texts, dtype=object).str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+            local, words = pd.factorize(tokens.to_numpy(dtype=object))
+            ids = self._word_ids(words)[local]
+            lengths = np.bincount(tokens.index.to_numpy(dtype=np.int64), minlength=len(texts))
+            starts = np.cumsum(lengths) - lengths
+            # 展开到行 Expand to one (word, row) key per token of each row
+            known = codes >= 0
+            counts = lengths[codes[known]]
+            within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            word_ids = ids[np.repeat(starts[codes[known]], counts) + within]
+            keys.append(word_ids << 32 | np.repeat(positions[known], counts))
+        if keys:
+            # 排序后写入临时文件 Sorted, then spilled to a run file
+            run = os.path.join(self._tmp, f"run{len(self._runs)}.npy")
+            np.save(run, sorted_unique(np.concatenate(keys)))
+            self._runs.append(run)
+        if len(df):
+            self.first_id = self.first_id if self.rows else str(df["trial_id"].iloc[0])
+            self.last_id = str(df["trial_id"].iloc[-1])
+        self.rows += len(df)
+
+    def _merge_bounds(self, runs):
+        # 按键值分块，每块约merge_block个键 Key boundaries giving blocks of about merge_block keys
+        total = sum(len(run) for run in runs)
+        step = max(1, self.merge_block // (4 * max(len(runs), 1)))
+        sample = np.sort(np.concatenate([run[::step] for run in runs]))
+        per_block = max(1, self.merge_block // (step * max(len(runs), 1)))
+        inner = sample[per_block::per_block] if total else sample[:0]
+        return np.concatenate([[np.iinfo(np.int64).min], inner, [np.iinfo(np.int64).max]])
+
+    def close(self):
+        try:
+            runs = [np.load(run, mmap_mode="r") for run in self._runs]
+            total = sum(len(run) for run in runs)
+            counts = np.zeros(len(self._ids), dtype=np.int64)
+            rows = np.lib.format.open_memmap(os.path.join(self._tmp, "rows.npy"), mode="w+",
+                                             dtype=np.int32, shape=(total,)) if total else np.zeros(0, np.int32)
+            # 分块k路归并 Block-wise k-way merge over disjoint key ranges [low, high);
+            # the runs cover disjoint rows, so no key appears in two runs
+            done = 0
+            bounds = self._merge_bounds(runs) if runs else []
+            for low, high in zip(bounds[:-1], bounds[1:]):
+                block = np.sort(np.concatenate(
+                    [run[np.searchsorted(run, low):np.searchsorted(run, high)] for run in runs]))
+                rows[done:done + len(block)] = (block & 0xFFFFFFFF).astype(np.int32)
+                counts += np.bincount(block >> 32, minlength=len(self._ids))
+                done += len(block)
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            np.savez(self.path, tokens=np.array(list(self._ids), dtype=str), offsets=offsets,
+                     rows=rows, n_rows=self.rows,
+                     fields=np.array(self.fields), ends=np.array([self.first_id, self.last_id]))
+            del rows, runs
+        finally:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+class TextIndex:
+    """读取的索引 A loaded index; search() returns sorted row positions"""
+
+    def __init__(self, tokens, offsets, rows, n_rows, fields, ends):
+        self.tokens, self.offsets, self.rows = tokens, offsets, rows
+        self.n_rows, self.fields, self.ends = int(n_rows), list(fields), list(ends)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with np.load(path) as saved:
+            return cls(saved["tokens"], saved["offsets"], saved["rows"], saved["n_rows"],
+                       saved["fields"], saved["ends"])
+
+    def matches(self, df):
+        """索引是否对应这张表 Whether the index was built from this table"""
+        if self.n_rows != len(df) or not set(INDEX_FIELDS) <= set(self.fields):
+            return False
+        return not len(df) or [str(df["trial_id"].iloc[0]), str(df["trial_id"].iloc[-1])] == self.ends
+
+    def _containing(self, token):
+        # 包含该片段的词的倒排表之并 Union of the postings of every token containing the fragment
+        hits = np.flatnonzero(np.char.find(self.tokens, token) >= 0)
+        if not len(hits):
+            return np.array([], dtype=np.int32)
+        return sorted_unique(np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in hits]))
+
+    def search(self, term, df=None, fields=INDEX_FIELDS):
+        """
+        检索 Row positions whose fields contain term (literal, any case).
+        Terms spanning several tokens need df, the indexed table, to check
+        the candidate rows.
+        """
+        parts = TOKEN_PATTERN.findall(term.lower())
+        if not parts:
+            raise ValueError(f"Search term {term!r} has no word characters")
+        candidates = self._containing(parts[0])
+        for part in parts[1:]:
+            candidates = np.intersect1d(candidates, self._containing(part), assume_unique=True)
+        if len(parts) == 1 and parts[0] == term.lower() and list(fields) == self.fields:
+            return candidates
+        if df is None:
+            raise ValueError(f"Checking {term!r} needs the indexed table")
+        subset = df.iloc[candidates]
+        hit = np.zeros(len(candidates), dtype=bool)
+        for field in fields:
+            hit |= subset[field].str.contains(term, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        return candidates[hit]
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path, mtime):
+    return TextIndex.load(path)
+
+
+def load_index(path=INDEX_FILE):
+    """读取索引，没有时为None The saved index, None when there is none"""
+    if not os.path.exists(path):
+        return None
+    return _load_cached(path, os.path.getmtime(path))
+
+
+def scan(df, term, fields=INDEX_FIELDS):
+    # 全表扫描 Full-table scan, used when there is no index for df
+    mask = np.zeros(len(df), dtype=bool)
+    for field in fields:
+        mask |= df[field].str.contains(term, case=False, regex=False, na=False).to_numpy(dtype=bool)
+    return mask
+
+
+def mentioning(df, term, fields=INDEX_FIELDS):
+    """
+    提及某词的试验 Boolean mask of the trials of df (the cleaned table) whose
+    fields contain term, case-insensitively. Uses the saved index when it was
+    built from df, and a full scan otherwise.
+    """
+    index = load_index()
+    if index is None or not index.matches(df):
+        return pd.Series(scan(df, term, fields), index=df.index)
+    mask = np.zeros(len(df), dtype=bool)
+    mask[index.search(term, df, fields)] = True
+    return pd.Series(mask, index=df.index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count trials mentioning each term, using the condition index")
+    parser.add_argument("terms", nargs="+")
+    parser.add_argument("--compare", action="store_true", help="also time a full str.contains scan")
+    args = parser.parse_args()
+
+    from DataStore import load_cleaned
+    df = load_cleaned(columns=["trial_id"] + INDEX_FIELDS)
+    index = load_index()
+    if index is None or not index.matches(df):
+        raise SystemExit(f"{INDEX_FILE} is missing or out of date; run CleanData.py first")
+    for term in args.terms:
+        start = time.perf_counter()
+        rows = index.search(term, df)
+        line = f"{term}: {len(rows)} trials in {(time.perf_counter() - start) * 1000:.1f} ms"
+        if args.compare:
+            start = time.perf_counter()
+            assert scan(df, term).sum() == len(rows)
+            line += f" (scan {(time.perf_counter() - start) * 1000:.1f} ms)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# DataFit模型基准测试 DataFit model fitting benchmark
+# Cleans the model's columns of a synthetic export (see synth_ictrp.py) and
+# fits each feature set, reporting the design matrix size, fit time and peak
+# RSS. The extended set builds a sparse matrix with thousands of columns.
+#
+#   python benchmarks/bench_datafit.py --size 1m
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from synth_ictrp import ROOT, generate, parse_rows
+
+sys.path.insert(0, ROOT)
+from CleanData import clean_chunk, read_raw
+from DataFit import FEATURE_SETS, build_model, feature_columns, prepare_features
+from Instrument import measure
+
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+# 清洗模型列所需的原始列 Raw columns needed to clean the model's columns
+RAW_COLUMNS = ["trial_id", "phase", "study_type", "primary_sponsor", "country_codes", "standardised_condition",
+               "source_register", "date_registration", "results_ind"]
+
+
+def load_model_frame(path, chunksize=200_000):
+    """只清洗模型用到的列 Clean only the columns the model uses, chunk by chunk"""
+    columns = sorted({col for name in FEATURE_SETS for col in feature_columns(name)} | {"results_posted"})
+    chunks = [clean_chunk(chunk)[0][columns] for chunk in read_raw(path, chunksize=chunksize, usecols=RAW_COLUMNS)]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataFit model fitting benchmark")
+    parser.add_argument("--size", default="1m", help="synthetic export size (10k, 100k, 1m, ...)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--features", nargs="+", default=sorted(FEATURE_SETS), choices=sorted(FEATURE_SETS))
+    args = parser.parse_args()
+
+    path = os.path.join(DATA_DIR, f"ictrp_{args.size.lower()}_seed{args.seed}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {path}")
+        generate(parse_rows(args.size), path, seed=args.seed)
+    df = load_model_frame(path)
+    y = df["results_posted"].astype(int)
+    print(f"{len(df)} cleaned rows, {y.mean() * 100:.1f}% posted results")
+
+    print(f"  {'features':<10}{'columns':>9}{'nnz':>12}{'encode s':>10}{'fit s':>9}{'peak MB':>9}")
+    for name in args.features:
+        X = prepare_features(df, name)
+        model = build_model(name)
+        with measure(f"encode {name}") as encode:
+            design = model.named_steps["encoder"].fit_transform(X)
+        with measure(f"fit {name}") as fit:
+            model.named_steps["logit"].fit(design, y)
+        print(f"  {name:<10}{design.shape[1]:>9}{design.nnz:>12}{encode['wall_s']:>10.2f}"
+              f"{fit['wall_s']:>9.2f}{max(encode['peak_rss_mb'], fit['peak_rss_mb']):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# 流水线规模基准测试 Pipeline scaling benchmark
+# Runs every stage on synthetic ICTRP exports of increasing size (see
+# synth_ictrp.py) and compares the wall time of each stage with the stored
+# baseline in benchmarks/baseline.json. Exits with status 1 when a stage is
+# slower than its baseline by more than the threshold. Baselines depend on
+# the machine, so record your own with --update-baseline first. Each stage
+# runs once untimed and then --repeat times; the median is compared.
+#
+#   python benchmarks/bench_pipeline.py --sizes 10k 100k
+#   python benchmarks/bench_pipeline.py --sizes 10k 100k --update-baseline
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from synth_ictrp import ROOT, SIZES, parse_rows
+
+STAGES = ["CleanData", "DataFit", "ExtractDrug", "DrugNetwork", "Network", "visualization", "pregnant"]
+DATA_DIR = os.path.join(ROOT, "benchmarks", "data")
+WORK_DIR = os.path.join(ROOT, "benchmarks", "work")
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baseline.json")
+# 大文件用流式清洗 Clean files of this many rows or more with --stream
+STREAM_ROWS = 1_000_000
+
+
+def prepare(size, seed):
+    """生成（或复用）合成文件并建立工作目录 Synthetic file and a work directory for one size"""
+    rows = parse_rows(size)
+    data_path = os.path.join(DATA_DIR, f"ictrp_{size}_seed{seed}.csv")
+    if not os.path.exists(data_path):
+        # 在子进程中生成，避免本进程的内存峰值计入各阶段
+        # Generate in a child process so this process stays small: a stage's
+        # peak RSS also counts the memory of the process that started it
+        subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "synth_ictrp.py"),
+                        "--size", size, "--out", data_path, "--seed", str(seed)], check=True)
+    work = os.path.join(WORK_DIR, size)
+    shutil.rmtree(work, ignore_errors=True)
+    for sub in ["CleanedData", "CleanedDataPlt"]:
+        os.makedirs(os.path.join(work, sub))
+    # 各阶段使用相对路径 The stages use paths relative to the working directory
+    os.symlink(data_path, os.path.join(work, "ictrp_data.csv"))
+    shutil.copy(os.path.join(ROOT, "countries.geo.json"), work)
+    return rows, work
+
+
+def run_stage(name, rows, work):
+    """在子进程中运行阶段 Run one stage in its own process; (ok, wall seconds, peak RSS MB)"""
+    command = [sys.executable, os.path.join(ROOT, f"{name}.py")]
+    if name == "CleanData" and rows >= STREAM_ROWS:
+        command.append("--stream")
+    env = dict(os.environ, MPLBACKEND="Agg")
+    start = time.perf_counter()
+    with open(os.path.join(work, f"{name}.log"), "w") as log:
+        process = subprocess.Popen(command, cwd=work, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4给出这个子进程自己的资源使用 wait4 reports this child's own resource usage
+        _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    peak = usage.ru_maxrss / 1024 if sys.platform != "darwin" else usage.ru_maxrss / 1024 ** 2
+    return os.waitstatus_to_exitcode(status) == 0, wall, peak
+
+
+def compare(results, baseline, threshold, min_delta):
+    """与基线比较 Return the (size, stage, seconds, baseline) entries that regressed"""
+    regressions = []
+    for size, stages in results.items():
+        for name, seconds in stages.items():
+            expected = baseline.get(size, {}).get(name)
+            if expected is None:
+                continue
+            if seconds > expected * (1 + threshold) and seconds - expected > min_delta:
+                regressions.append((size, name, seconds, expected))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline scaling benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"],
+                        help=f"sizes to run ({', '.join(SIZES)})")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed runs of each stage; their median is compared")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="untimed runs of each stage first (cold caches, imports)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.5,
+                        help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these timings as the new baseline instead of comparing")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results, failed = {}, []
+    for size in [s.lower() for s in args.sizes]:
+        rows, work = prepare(size, args.seed)
+        results[size] = {}
+        print(f"\n{size} ({rows} rows)")
+        print(f"  {'stage':<15}{'seconds':>10}{'baseline':>10}{'peak MB':>10}")
+        for name in args.stages:
+            # 预热一次再取中位数，单次计时不足以判断回归
+            # Discard warm-up runs and take the median: a single timing is too noisy for the gate
+            runs = [run_stage(name, rows, work) for _ in range(args.warmup + max(args.repeat, 1))]
+            ok = all(run[0] for run in runs)
+            timed = runs[args.warmup:]
+            seconds, peak = statistics.median(run[1] for run in timed), max(run[2] for run in timed)
+            expected = baseline.get(size, {}).get(name)
+            expected_text = f"{expected:10.2f}" if expected is not None else f"{'-':>10}"
+            print(f"  {name:<15}{seconds:10.2f}{expected_text}{peak:10.0f}{'' if ok else '  FAILED'}")
+            if not ok:
+                failed.append((size, name))
+                print(f"  see {os.path.join(work, name + '.log')}")
+                break
+            results[size][name] = round(seconds, 3)
+
+    if args.update_baseline:
+        for size, stages in results.items():
+            baseline.setdefault(size, {}).update(stages)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 1 if failed else 0
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    for size, name, seconds, expected in regressions:
+        print(f"REGRESSION {size} {name}: {seconds:.2f}s vs baseline {expected:.2f}s "
+              f"(+{(seconds / expected - 1) * 100:.0f}%)")
+    if failed or regressions:
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
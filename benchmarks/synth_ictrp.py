@@ -0,0 +1,110 @@
+# 合成ICTRP数据 Synthetic ICTRP export generator
+# Builds raw files with the real column schema by resampling the real export
+# in groups of related columns: countries (the '|'-joined codes with their
+# names and centre), sponsors, conditions with their titles and interventions,
+# age/gender criteria, HTML inclusion/exclusion criteria, design and results.
+# Each group keeps its real joint values and frequencies; groups are mixed
+# independently so the rows are new combinations. Registration dates are
+# shifted by up to half a year and trial ids are renumbered per register.
+# Rows are written in chunks, so even 10M rows use bounded memory.
+#
+#   python benchmarks/synth_ictrp.py --size 1m --out benchmarks/data/ictrp_1m.csv
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from CleanData import RAW_FILE
+from DataStore import RAW_SCHEMA
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+CHUNK_ROWS = 100_000
+DATE_SHIFT_DAYS = 182
+
+# 一起抽样的列 Columns resampled together from one real row
+COLUMN_GROUPS = [
+    ["trial_id", "source_register", "web_address", "retrospective_flag"],
+    ["study_title", "standardised_condition", "original_condition", "intervention"],
+    ["country_codes", "countries", "centre"],
+    ["date_registration", "date_enrollment"],
+    ["study_type", "phase", "randomization", "placebo", "masking", "primary_purpose",
+     "endpoint_classification", "intervention_model"],
+    ["primary_outcome", "secondary_outcome", "target_sample_size"],
+    ["inclusion_age_min", "inclusion_age_max", "inclusion_gender", "pregnant_participants"],
+    ["inclusion_criteria", "exclusion_criteria"],
+    ["primary_sponsor", "secondary_sponsor", "contact_affiliation"],
+    ["results_ind", "results_date_completed", "results_date_posted", "results_url_link"],
+]
+
+
+def load_real(raw_path=os.path.join(ROOT, RAW_FILE)):
+    """读取真实数据作为抽样来源 The real export the synthetic rows are drawn from"""
+    real = pd.read_csv(raw_path, dtype=RAW_SCHEMA)
+    missing = set(real.columns) - {col for group in COLUMN_GROUPS for col in group}
+    assert not missing, f"columns without a resampling group: {sorted(missing)}"
+    return real
+
+
+def shift_dates(dates, days):
+    # 平移日期，无效日期保持原样 Shift valid dates, leave anything unparseable untouched
+    parsed = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+    shifted = (parsed + pd.to_timedelta(days, unit="D")).dt.strftime("%Y-%m-%d")
+    return shifted.where(parsed.notna(), dates)
+
+
+def generate_chunk(real, rows, start, rng):
+    """生成一块合成数据 Generate `rows` synthetic rows numbered from `start`"""
+    chunk = {}
+    for group in COLUMN_GROUPS:
+        picked = real[group].iloc[rng.integers(0, len(real), size=rows)].reset_index(drop=True)
+        for col in group:
+            chunk[col] = picked[col]
+    chunk = pd.DataFrame(chunk)[real.columns]
+
+    # 按注册机构前缀重新编号 Renumber ids, keeping each register's prefix
+    prefix = chunk["trial_id"].str.extract(r"^([A-Za-z-]+)", expand=False).fillna("SYN")
+    numbers = pd.Series(np.arange(start, start + rows), dtype="int64").map("{:09d}".format)
+    chunk["trial_id"] = prefix + numbers
+
+    days = rng.integers(-DATE_SHIFT_DAYS, DATE_SHIFT_DAYS + 1, size=rows)
+    for col in ["date_registration", "date_enrollment"]:
+        chunk[col] = shift_dates(chunk[col], days)
+    return chunk
+
+
+def generate(rows, out_path, seed=42, chunk_rows=CHUNK_ROWS, real=None):
+    """写出合成文件 Write a synthetic export of `rows` rows to out_path"""
+    real = load_real() if real is None else real
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8", newline="") as out:
+        for start in range(0, rows, chunk_rows):
+            chunk = generate_chunk(real, min(chunk_rows, rows - start), start, rng)
+            chunk.to_csv(out, index=False, header=(start == 0))
+    return out_path
+
+
+def parse_rows(text):
+    """10k/1m这样的规模或行数 A size name such as 10k/1m, or a plain row count"""
+    return SIZES[text.lower()] if text.lower() in SIZES else int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ICTRP export")
+    parser.add_argument("--size", default="10k", help=f"one of {', '.join(SIZES)} or a row count")
+    parser.add_argument("--out", help="output CSV (default benchmarks/data/ictrp_<size>.csv)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = parse_rows(args.size)
+    out_path = args.out or os.path.join(ROOT, "benchmarks", "data", f"ictrp_{args.size.lower()}.csv")
+    generate(rows, out_path, seed=args.seed)
+    print(f"{rows} rows written to {out_path} ({os.path.getsize(out_path) / 1024 ** 2:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
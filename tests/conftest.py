@@ -0,0 +1,5 @@
+# 让测试可以导入顶层脚本 Let the tests import the top-level scripts
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from CleanData import parse_age_column, validate_age
+
+
+def test_parse_age_column_matches_validate_age():
+    ages = pd.Series(["18 Years", "6 Months", "200 Years", "1500 Months", "2 Weeks", "N/A", None])
+    parsed = parse_age_column(ages)
+    assert parsed["valid"].tolist() == [validate_age(age) for age in ages]
+    assert parsed["months"].tolist()[:2] == [216.0, 6.0]
+
+
+def test_parse_age_column_non_ascii_digits():
+    # 阿拉伯-印度数字和全角数字 Arabic-Indic and full-width digits, as int() reads them
+    parsed = parse_age_column(pd.Series(["٣ Years", "６ Months", "١٥٠ Years"]))
+    assert parsed["value"].tolist() == [3.0, 6.0, 150.0]
+    assert parsed["months"].tolist() == [36.0, 6.0, 1800.0]
+    assert parsed["valid"].tolist() == [True, True, False]
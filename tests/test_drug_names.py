@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+import pytest
+
+import CleanData
+from DrugNames import DrugMatcher, normalize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TRICKY = [
+    "Artesunate + mefloquine then artesunate",
+    "L-AmB 3 mg/kg vs AmBisome®",
+    "noxafilx and posaconazoles",
+    "Levo-praziquantel (L-PZQ) or praziquantel",
+    "İvermectin",
+    "",
+]
+
+
+class AllOccurrences:
+    # 参考自动机：给出每个词的每次出现 Reference automaton: every occurrence of every word,
+    # as (end index, length) like ahocorasick.Automaton.iter
+    def __init__(self, words):
+        self.words = list(words)
+
+    def iter(self, text):
+        for end in range(len(text)):
+            for word in self.words:
+                if text.endswith(word, 0, end + 1):
+                    yield end, len(word)
+
+
+@pytest.fixture(scope="module")
+def entries():
+    raw = pd.read_csv(os.path.join(ROOT, CleanData.RAW_FILE), dtype=str, encoding="utf-8")
+    drugs = raw["intervention"].dropna().str.extractall(r'Drug:\s*(?P<drug>[^;|\n]+)')["drug"].str.strip()
+    return list(pd.unique(drugs)) + TRICKY
+
+
+@pytest.fixture(scope="module")
+def regex_matcher():
+    # 即使装了pyahocorasick也用正则 The regex fallback, even with pyahocorasick installed
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(DrugMatcher, "_build_automaton", lambda self: None)
+        matcher = DrugMatcher()
+    assert matcher.automaton is None
+    return matcher
+
+
+def test_automaton_spans_match_regex(entries, regex_matcher, monkeypatch):
+    monkeypatch.setattr(DrugMatcher, "_build_automaton", lambda self: AllOccurrences(self.canonical))
+    matcher = DrugMatcher()
+    for entry in entries:
+        assert matcher.find(entry) == regex_matcher.find(entry), entry
+
+
+def test_pyahocorasick_matches_regex(entries, regex_matcher):
+    pytest.importorskip("ahocorasick")
+    matcher = DrugMatcher()
+    assert matcher.automaton is not None
+    for entry in entries:
+        assert matcher.find(entry) == regex_matcher.find(entry), entry
+
+
+def test_leftmost_longest_whole_words(regex_matcher):
+    assert regex_matcher.find(TRICKY[0]) == ["Artesunate-mefloquine", "Artesunate"]
+    assert regex_matcher.find(TRICKY[1]) == ["Liposomal amphotericin B"]
+    assert regex_matcher.find(TRICKY[2]) == []
+
+
+def test_abbreviations_only_as_whole_entries():
+    assert normalize("PZQ 40 mg/kg") == ("Praziquantel",)
+    assert normalize("Bnz®") == ("Benznidazole",)
+    assert normalize("S/P") == ("Sulfadoxine-pyrimethamine",)
+    # 自由文本中的缩写不算 Abbreviations inside free text do not count
+    assert normalize("PZQ dose dec") == ("PZQ dose dec",)
+    assert normalize("DEC 6mg/kg + albendazole") == ("Albendazole",)
+    assert normalize("E1224 Placebo") == ("Placebo",)
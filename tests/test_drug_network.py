@@ -0,0 +1,44 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DrugNetwork import cooccurrence, incidence_matrix, top_partners
+
+
+@pytest.fixture
+def trial_drugs():
+    # 随机试验-药物表，含重复条目 Random trial-drug table, with repeated entries
+    rng = np.random.default_rng(7)
+    drugs = [f"Drug {chr(65 + i)}" for i in range(12)]
+    rows = [(f"T{trial}", drug) for trial in range(300)
+            for drug in rng.choice(drugs, size=rng.integers(1, 5))]
+    return pd.DataFrame(rows, columns=["trial_id", "drug"])
+
+
+def test_cooccurrence_matches_pair_counts(trial_drugs):
+    sets = trial_drugs.groupby("trial_id")["drug"].agg(set)
+    per_drug = Counter(drug for drugs in sets for drug in drugs)
+    pairs = Counter(pair for drugs in sets for pair in combinations(sorted(drugs), 2))
+    n = len(sets)
+
+    edges = cooccurrence(*incidence_matrix(trial_drugs))
+    assert len(edges) == len(pairs)
+    for row in edges.itertuples(index=False):
+        assert row.drug_a < row.drug_b
+        assert row.trials == pairs[row.drug_a, row.drug_b]
+        assert row.lift == pytest.approx(row.trials * n / (per_drug[row.drug_a] * per_drug[row.drug_b]))
+    assert edges["trials"].is_monotonic_decreasing
+
+
+def test_top_partners_matches_sorted_edges(trial_drugs):
+    edges = cooccurrence(*incidence_matrix(trial_drugs))
+    partners = top_partners(edges, k=3)
+    for drug, group in partners.groupby("drug"):
+        mine = edges[(edges["drug_a"] == drug) | (edges["drug_b"] == drug)]
+        other = np.where(mine["drug_a"] == drug, mine["drug_b"], mine["drug_a"])
+        expected = sorted(zip(-mine["trials"], -mine["lift"], other))[:3]
+        assert group["partner"].tolist() == [partner for _, _, partner in expected]
+        assert group["rank"].tolist() == list(range(1, len(expected) + 1))
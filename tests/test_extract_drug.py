@@ -0,0 +1,45 @@
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import CleanData
+from CleanData import clean_chunk, read_raw
+from ExtractDrug import DRUG_PATTERN, drugs_by_condition, extract_drugs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def cleaned():
+    df, _ = clean_chunk(read_raw(os.path.join(ROOT, CleanData.RAW_FILE)))
+    return df.reset_index(drop=True)
+
+
+def test_extract_drugs_matches_row_loop(cleaned):
+    # 逐行re.findall的参考结果 Reference: re.findall row by row
+    expected = []
+    for row in cleaned.itertuples():
+        year = pd.to_datetime(row.date_registration, errors="coerce")
+        if pd.isna(year) or pd.isna(row.intervention):
+            continue
+        for drug in re.findall(DRUG_PATTERN, str(row.intervention), flags=re.IGNORECASE):
+            expected.append((row.trial_id, year.year, drug.strip()))
+    table = extract_drugs(cleaned)
+    assert len(expected) > 100
+    assert list(table.itertuples(index=False, name=None)) == expected
+
+
+def test_drugs_by_condition_matches_row_loop(cleaned):
+    table = extract_drugs(cleaned).assign(entry="")
+    expected = []
+    for label, row in table.iterrows():
+        conditions = cleaned.loc[label, "standardised_condition"]
+        if pd.isna(conditions):
+            continue
+        for condition in str(conditions).split("|"):
+            if condition.strip():
+                expected.append((row["trial_id"], condition.strip(), row["year"], row["drug"]))
+    long = drugs_by_condition(table, cleaned)
+    assert sorted(long[["trial_id", "condition", "year", "drug"]].itertuples(index=False, name=None)) == sorted(expected)
@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pytest
+
+import CleanData
+from CleanData import clean_chunk, incremental_clean, read_raw
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def raw_rows(tmp_path, monkeypatch):
+    # 在临时目录中运行，清单和存储写在那里 Run in a temporary directory so the manifest and store go there
+    rows = pd.read_csv(os.path.join(ROOT, CleanData.RAW_FILE), dtype=str, nrows=60, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("CleanedData")
+    return rows
+
+
+def check_against_full_clean(rows):
+    rows.to_csv("raw.csv", index=False)
+    cleaned, raw_count, _ = incremental_clean("raw.csv")
+    expected, _ = clean_chunk(read_raw("raw.csv"))
+    assert raw_count == len(rows)
+    pd.testing.assert_frame_equal(cleaned, expected.reset_index(drop=True), check_categorical=False)
+
+
+def test_incremental_matches_full_clean_after_change_and_reorder(raw_rows):
+    check_against_full_clean(raw_rows)
+    changed = raw_rows.copy()
+    changed.loc[3, "primary_sponsor"] = "Ministry of Health"
+    check_against_full_clean(changed.iloc[::-1].reset_index(drop=True))
+    # 删除部分试验 Deleted trials drop out
+    check_against_full_clean(changed.iloc[10:].reset_index(drop=True))
+
+
+def test_incremental_with_repeated_trial_id(raw_rows):
+    check_against_full_clean(raw_rows)
+    repeated = pd.concat([raw_rows, raw_rows.iloc[[5, 7]]], ignore_index=True)
+    check_against_full_clean(repeated)
+    # 重复之后再回到唯一的trial_id The next run with unique ids again
+    check_against_full_clean(raw_rows)
+
+
+def test_incremental_reuses_store_until_cleaning_changes(raw_rows, monkeypatch, capsys):
+    check_against_full_clean(raw_rows)
+    check_against_full_clean(raw_rows)
+    assert f"0 new, 0 changed, 0 deleted, {len(raw_rows)} unchanged" in capsys.readouterr().out
+    # 清洗代码变化后全部重新清洗 Changed cleaning code re-cleans every row
+    monkeypatch.setattr(CleanData, "cleaning_fingerprint", lambda columns: "changed")
+    check_against_full_clean(raw_rows)
+    assert f"{len(raw_rows)} new" in capsys.readouterr().out
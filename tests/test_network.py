@@ -0,0 +1,29 @@
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from Network import collaboration_matrix
+
+
+def test_collaboration_matrix_matches_pair_counts():
+    # 随机试验-国家长表，含单国试验和重复国家 Random long table, with single-country trials and repeats
+    rng = np.random.default_rng(11)
+    countries = ["Brazil", "Bolivia", "Spain", "India", "Kenya", "Sudan", "Peru", "Chile"]
+    rows = [(f"T{trial}", country) for trial in range(400)
+            for country in rng.choice(countries, size=rng.integers(1, 5))]
+    trial_countries = pd.DataFrame(rows, columns=["trial_id", "country_name"])
+
+    sets = trial_countries.groupby("trial_id", sort=False)["country_name"].agg(list)
+    multi = [set(names) for names in sets if len(names) >= 2]
+    pairs = Counter(pair for names in multi for pair in combinations(sorted(names), 2))
+
+    adjacency, names, multi_country_trials = collaboration_matrix(trial_countries)
+    assert multi_country_trials == len(multi)
+    assert names.tolist() == list(pd.unique(trial_countries.loc[
+        trial_countries.groupby("trial_id")["trial_id"].transform("size") >= 2, "country_name"]))
+    dense = adjacency.toarray()
+    assert (dense == dense.T).all() and not dense.diagonal().any()
+    for i, j in zip(*np.triu_indices(len(names), k=1)):
+        assert dense[i, j] == pairs[tuple(sorted((names[i], names[j])))]
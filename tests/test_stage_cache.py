@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import StageCache
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("CleanedData")
+    return tmp_path
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_store_restores_and_links_identical_outputs(workdir):
+    write("CleanedData/a.csv", "x\n1\n")
+    StageCache.store("Stage", "fp1", ["CleanedData/a.csv"])
+    StageCache.store("Stage", "fp2", ["CleanedData/a.csv"])
+    first = os.path.join(StageCache.CACHE_DIR, "Stage", "fp1", "files", "CleanedData", "a.csv")
+    second = os.path.join(StageCache.CACHE_DIR, "Stage", "fp2", "files", "CleanedData", "a.csv")
+    assert os.path.samefile(first, second)
+    assert not os.path.samefile(first, "CleanedData/a.csv")
+    # 阶段就地重写输出不影响缓存 A stage rewriting its output in place leaves the cache intact
+    write("CleanedData/a.csv", "x\n2\n")
+    assert StageCache.restore("Stage", "fp1")
+    with open("CleanedData/a.csv", encoding="utf-8") as f:
+        assert f.read() == "x\n1\n"
+
+
+def test_store_keeps_the_most_recent_entries(workdir):
+    for i in range(5):
+        write("CleanedData/a.csv", f"x\n{i}\n")
+        StageCache.store("Stage", f"fp{i}", ["CleanedData/a.csv"], keep=2)
+    assert sorted(os.listdir(os.path.join(StageCache.CACHE_DIR, "Stage"))) == ["fp3", "fp4"]
+    assert not StageCache.restore("Stage", "fp0")
+    assert StageCache.restore("Stage", "fp3")
@@ -0,0 +1,47 @@
+import csv
+import os
+
+import pandas as pd
+import pytest
+
+import CleanData
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def raw_with_bad_line(tmp_path, monkeypatch):
+    # 含一行超长坏行的原始文件 A raw export with one over-long malformed line
+    rows = pd.read_csv(os.path.join(ROOT, CleanData.RAW_FILE), dtype=str, nrows=60, encoding="utf-8")
+    # 坏行的样本量若被计入会改变中位数 Counting the bad line's sample size would shift the median
+    rows["target_sample_size"] = [str(10 * (i + 1)) for i in range(len(rows))]
+    rows.loc[[4, 9], "target_sample_size"] = None
+    rows.loc[20, "target_sample_size"] = "1"
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("CleanedData")
+    with open("raw.csv", "w", encoding="utf-8", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(rows.columns)
+        for i, row in enumerate(rows.itertuples(index=False)):
+            fields = ["" if pd.isna(value) else value for value in row]
+            writer.writerow(fields + ["extra", "fields"] if i == 20 else fields)
+    return "raw.csv"
+
+
+def clean_output(file_path, **kwargs):
+    CleanData.main(file_path=file_path, **kwargs)
+    with open(CleanData.CLEANED_FILE, encoding="utf-8-sig") as cleaned:
+        return cleaned.read()
+
+
+def test_stream_matches_in_memory_with_bad_line(raw_with_bad_line):
+    in_memory = clean_output(raw_with_bad_line)
+    streamed = clean_output(raw_with_bad_line, stream=True, chunksize=17)
+    assert streamed == in_memory
+
+
+def test_usecols_skips_the_same_bad_lines(raw_with_bad_line):
+    full = CleanData.read_raw(raw_with_bad_line)
+    subset = pd.concat(CleanData.read_raw(raw_with_bad_line, chunksize=17, usecols=["target_sample_size", "trial_id"]))
+    assert list(subset.columns) == [c for c in full.columns if c in ("trial_id", "target_sample_size")]
+    assert subset["trial_id"].tolist() == full["trial_id"].tolist()
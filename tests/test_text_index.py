@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pytest
+
+import CleanData
+from CleanData import clean_chunk, read_raw
+from TextIndex import INDEX_FILE, TextIndex, TextIndexWriter, mentioning, scan
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TERMS = ["chagas", "CHAGAS", "leish", "visceral leishmaniasis", "malaria", "schisto", "a", "phase 2",
+         "disease,", "no-such-term"]
+
+
+@pytest.fixture(scope="module")
+def cleaned():
+    df, _ = clean_chunk(read_raw(os.path.join(ROOT, CleanData.RAW_FILE)))
+    return df.reset_index(drop=True)
+
+
+def build(df, path, chunksize, merge_block):
+    with TextIndexWriter(str(path), merge_block=merge_block) as writer:
+        for start in range(0, len(df), chunksize):
+            writer.write(df.iloc[start:start + chunksize])
+    return TextIndex.load(str(path))
+
+
+@pytest.mark.parametrize("chunksize, merge_block", [(10 ** 6, 1 << 22), (37, 64), (7, 8)])
+def test_search_matches_scan(cleaned, tmp_path, chunksize, merge_block):
+    index = build(cleaned, tmp_path / "index.npz", chunksize, merge_block)
+    assert index.matches(cleaned)
+    # 临时的分块文件已删除 The spilled runs are removed
+    assert [name for name in os.listdir(tmp_path) if name != "index.npz"] == []
+    for term in TERMS:
+        expected = np.flatnonzero(scan(cleaned, term))
+        assert index.search(term, cleaned).tolist() == expected.tolist(), term
+
+
+def test_mentioning_falls_back_to_scan(cleaned, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(INDEX_FILE))
+    # 没有索引，或索引不是这张表的 No index, or an index of another table
+    assert mentioning(cleaned, "chagas").tolist() == scan(cleaned, "chagas").tolist()
+    build(cleaned.iloc[:50], INDEX_FILE, 20, 1 << 22)
+    assert mentioning(cleaned, "chagas").tolist() == scan(cleaned, "chagas").tolist()
+    subset = cleaned.iloc[:50]
+    assert mentioning(subset, "chagas").tolist() == scan(subset, "chagas").tolist()